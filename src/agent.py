@@ -2,9 +2,13 @@
 Autonomous AI Agent with psychological attachment styles for the dating economy
 """
 import random
+import numpy as np
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
+from kernels import (HAS_NUMBA, ATTACH_SECURE, ATTACH_ANXIOUS, ATTACH_AVOIDANT, ATTACH_DISORGANIZED,
+                     OUTCOME_NONE, OUTCOME_COOPERATED, OUTCOME_DEFECTED,
+                     cooperation_prob, trust_delta, trust_update)
 
 class AttachmentStyle(Enum):
     SECURE = "secure"
@@ -18,25 +22,109 @@ class Goal(Enum):
     LEARNING = "learning"  # Optimize strategy over time
     STABILITY = "stability"  # Form long-term bonds
 
+# Integer codes the numeric kernels use in place of the enums and outcome strings
+_ATTACH_CODES = {
+    AttachmentStyle.SECURE: ATTACH_SECURE,
+    AttachmentStyle.ANXIOUS: ATTACH_ANXIOUS,
+    AttachmentStyle.AVOIDANT: ATTACH_AVOIDANT,
+    AttachmentStyle.DISORGANIZED: ATTACH_DISORGANIZED,
+}
+_OUTCOME_CODES = {"cooperated": OUTCOME_COOPERATED, "defected": OUTCOME_DEFECTED}
+
+# Per-style constants, indexed by attachment code (SECURE, ANXIOUS, AVOIDANT, DISORGANIZED).
+# DISORGANIZED agents act at random where these apply, so their entries are unused.
+_INITIAL_TRUST = (70.0, 50.0, 30.0, None)
+_PARTNER_THRESHOLD = (
+    50,  # SECURE: choose based on compatibility
+    30,  # ANXIOUS: more desperate, lower standards
+    70,  # AVOIDANT: high standards, rarely commit
+    None,
+)
+_REMATCH_TRUST = (
+    40,  # SECURE: willing if trust recovers
+    20,  # ANXIOUS: desperate to reconnect
+    70,  # AVOIDANT: rarely rematch
+    None,
+)
+
+# Attachment style compatibility matrix, [my style][their style]; None means a random bonus
+_COMPAT_BONUS = (
+    (20, 10, 5, None),
+    (15, -10, -20, None),
+    (5, -15, 0, None),
+    (0, None, None, None),
+)
+
+# Decision reasons, indexed by their bit in the mask cooperation_prob returns
+_REASONS = (
+    "Base curiosity",
+    "Strong trust in {partner}",
+    "Wary of {partner}",
+    "Valuing fairness",
+    "Securely building connection",
+    "Eager to please (Anxious)",
+    "Hurting from past betrayal",
+    "Keeping emotional distance",
+    "Unpredictable emotional flux",
+    "Prioritizing MON earnings",
+    "Seeking long-term stability",
+    "Feeling optimistic",
+    "Feeling frustrated",
+    "Risk is too high for my comfort",
+    "Reciprocating previous kindness",
+    "Retaliating against defection",
+)
+
+def compute_trust_delta(attachment: AttachmentStyle, my_move: bool, partner_move: bool) -> float:
+    """Change in trust an agent with this attachment style feels after a game"""
+    return trust_delta(my_move, partner_move, _ATTACH_CODES[attachment])
+
 @dataclass
 class AgentProfile:
     """Rich agent profile with goals, skills, and preferences"""
     name: str
     attachment_style: AttachmentStyle
-    goals: List[Goal]
+    goals: Tuple[Goal, ...]
     risk_tolerance: float  # 0.0-1.0
     ethics_fairness: float  # 0.0-1.0, how much they value fairness
     ethics_reciprocity: float  # 0.0-1.0, how much they value tit-for-tat
     skill_negotiation: float  # 0.0-1.0
     skill_patience: float  # 0.0-1.0
     skill_adaptability: float  # 0.0-1.0
-    preferred_partner_goals: List[Goal]
+    preferred_partner_goals: Tuple[Goal, ...]
     preferred_trust_threshold: float  # Minimum trust to form bond
     address: Optional[str] = None
     private_key: Optional[str] = None
     reputation_score: float = 50.0  # Community reputation
     
-@dataclass
+    @staticmethod
+    def compatibility(a: 'AgentProfile', b: 'AgentProfile') -> float:
+        """Compatibility score (0-100) of a with b, from their profiles alone"""
+        score = 50.0
+        
+        # Value alignment - do goals overlap?
+        goal_overlap = len(set(a.goals) & set(b.goals))
+        score += goal_overlap * 10
+        
+        # Skill complementarity - balanced skills create stronger bonds
+        skill_diff = abs(
+            (a.skill_negotiation + a.skill_patience + a.skill_adaptability) -
+            (b.skill_negotiation + b.skill_patience + b.skill_adaptability)
+        )
+        score += (1.0 - skill_diff) * 10  # Lower difference = higher score
+        
+        # Attachment style compatibility; the random bonus is drawn even when the
+        # matrix has an entry, so seeded runs stay reproducible
+        random_bonus = random.randint(-10, 10)
+        bonus = _COMPAT_BONUS[_ATTACH_CODES[a.attachment_style]][_ATTACH_CODES[b.attachment_style]]
+        score += random_bonus if bonus is None else bonus
+        
+        # Reputation
+        score += b.reputation_score * 0.1
+        
+        return max(0, min(100, score))
+    
+@dataclass(slots=True)
 class RelationshipMemory:
     """Memory of interactions with a specific partner"""
     partner_name: str
@@ -60,6 +148,8 @@ class Agent:
         self.game_history: List[Dict] = []
         self.emotional_state: float = 50.0  # 0-100, affects decision-making
         self.last_decision_reason: str = "Initial state"
+        self._attach_code: int = _ATTACH_CODES[profile.attachment_style]
+        self._idx: int = -1  # Position in the owning GameEngine's arrays
         
     def select_partner(self, available_agents: List['Agent']) -> Optional['Agent']:
         """Autonomously select a partner based on compatibility and goals"""
@@ -77,146 +167,36 @@ class Agent:
         if not scores:
             return None
         
+        if self._attach_code == ATTACH_DISORGANIZED:
+            # Random, chaotic; picks among the scored candidates so it never returns itself
+            return random.choice(scores)[1] if random.random() > 0.5 else None
+        
         # Sort by compatibility
         scores.sort(reverse=True, key=lambda x: x[0])
         
         # Attachment style influences selection
-        if self.profile.attachment_style == AttachmentStyle.SECURE:
-            # Choose based on compatibility
-            return scores[0][1] if scores[0][0] > 50 else None
-        elif self.profile.attachment_style == AttachmentStyle.ANXIOUS:
-            # More desperate, lower standards
-            return scores[0][1] if scores[0][0] > 30 else None
-        elif self.profile.attachment_style == AttachmentStyle.AVOIDANT:
-            # High standards, rarely commit
-            return scores[0][1] if scores[0][0] > 70 else None
-        else:  # DISORGANIZED
-            # Random, chaotic
-            return random.choice(available_agents) if random.random() > 0.5 else None
+        return scores[0][1] if scores[0][0] > _PARTNER_THRESHOLD[self._attach_code] else None
     
     def _calculate_compatibility(self, other: 'Agent') -> float:
         """Calculate compatibility score with another agent"""
-        score = 50.0
-        
-        # Value alignment - do goals overlap?
-        goal_overlap = len(set(self.profile.goals) & set(other.profile.goals))
-        score += goal_overlap * 10
-        
-        # Skill complementarity - balanced skills create stronger bonds
-        skill_diff = abs(
-            (self.profile.skill_negotiation + self.profile.skill_patience + self.profile.skill_adaptability) -
-            (other.profile.skill_negotiation + other.profile.skill_patience + other.profile.skill_adaptability)
-        )
-        score += (1.0 - skill_diff) * 10  # Lower difference = higher score
+        score = AgentProfile.compatibility(self.profile, other.profile)
         
-        # Attachment style compatibility matrix
-        compat_matrix = {
-            (AttachmentStyle.SECURE, AttachmentStyle.SECURE): 20,
-            (AttachmentStyle.SECURE, AttachmentStyle.ANXIOUS): 10,
-            (AttachmentStyle.SECURE, AttachmentStyle.AVOIDANT): 5,
-            (AttachmentStyle.ANXIOUS, AttachmentStyle.SECURE): 15,
-            (AttachmentStyle.ANXIOUS, AttachmentStyle.ANXIOUS): -10,
-            (AttachmentStyle.ANXIOUS, AttachmentStyle.AVOIDANT): -20,
-            (AttachmentStyle.AVOIDANT, AttachmentStyle.SECURE): 5,
-            (AttachmentStyle.AVOIDANT, AttachmentStyle.ANXIOUS): -15,
-            (AttachmentStyle.AVOIDANT, AttachmentStyle.AVOIDANT): 0,
-            (AttachmentStyle.DISORGANIZED, AttachmentStyle.SECURE): 0,
-        }
-        key = (self.profile.attachment_style, other.profile.attachment_style)
-        score += compat_matrix.get(key, random.randint(-10, 10))
-        
-        # Past relationship history
-        if other.profile.name in self.relationships:
-            memory = self.relationships[other.profile.name]
+        # Past relationship history (never negative, so clamping the profile score first is safe)
+        memory = self.relationships.get(other.profile.name)
+        if memory is not None:
             score += memory.trust_score * 0.3
             score += memory.bond_strength * 0.2
         
-        # Reputation
-        score += other.profile.reputation_score * 0.1
-        
-        return max(0, min(100, score))
+        return min(100, score)
     
     def decide_move(self, partner: 'Agent', stake: float) -> bool:
         """Decide whether to cooperate or defect (True = cooperate)"""
-        # Get or create relationship memory
-        if partner.profile.name not in self.relationships:
-            self.relationships[partner.profile.name] = RelationshipMemory(
-                partner_name=partner.profile.name,
-                trust_score=self._initial_trust()
-            )
-        
-        memory = self.relationships[partner.profile.name]
+        return self.decide_move_fast(self._relationship_with(partner), stake)
+    
+    def decide_move_fast(self, memory: RelationshipMemory, stake: float) -> bool:
+        """decide_move against an already looked-up relationship memory"""
         reasons = []
-        
-        # Base probability of cooperation
-        coop_prob = 0.5
-        reasons.append("Base curiosity")
-        
-        # Trust influence (0-100 -> 0-40%)
-        trust_effect = (memory.trust_score / 100) * 0.4
-        coop_prob += trust_effect
-        if trust_effect > 0.2:
-            reasons.append(f"Strong trust in {partner.profile.name}")
-        elif trust_effect < 0.1:
-            reasons.append(f"Wary of {partner.profile.name}")
-        
-        # Ethics influence
-        coop_prob += self.profile.ethics_fairness * 0.2
-        if self.profile.ethics_fairness > 0.7:
-            reasons.append("Valuing fairness")
-        
-        # Attachment style modifiers
-        if self.profile.attachment_style == AttachmentStyle.SECURE:
-            coop_prob += 0.2
-            reasons.append("Securely building connection")
-        elif self.profile.attachment_style == AttachmentStyle.ANXIOUS:
-            if memory.total_games < 3:
-                coop_prob += 0.3
-                reasons.append("Eager to please (Anxious)")
-            if memory.times_betrayed > 0:
-                betrayal_penalty = memory.times_betrayed * 0.15
-                coop_prob -= betrayal_penalty
-                reasons.append("Hurting from past betrayal")
-        elif self.profile.attachment_style == AttachmentStyle.AVOIDANT:
-            coop_prob -= 0.3
-            reasons.append("Keeping emotional distance")
-        else:  # DISORGANIZED
-            rand_mod = random.uniform(-0.3, 0.3)
-            coop_prob += rand_mod
-            reasons.append("Unpredictable emotional flux")
-        
-        # Goal-based modifiers
-        if Goal.PROFIT in self.profile.goals:
-            coop_prob -= 0.1
-            reasons.append("Prioritizing MON earnings")
-        if Goal.STABILITY in self.profile.goals:
-            coop_prob += 0.15
-            reasons.append("Seeking long-term stability")
-        
-        # Emotional state influence
-        emotion_mod = (self.emotional_state - 50) / 100 * 0.2
-        coop_prob += emotion_mod
-        if emotion_mod > 0.05:
-            reasons.append("Feeling optimistic")
-        elif emotion_mod < -0.05:
-            reasons.append("Feeling frustrated")
-        
-        # Risk tolerance
-        if stake > self.balance * self.profile.risk_tolerance:
-            coop_prob -= 0.15
-            reasons.append("Risk is too high for my comfort")
-        
-        # Tit-for-tat strategy (reciprocity)
-        if memory.total_games > 0 and self.profile.ethics_reciprocity > 0.5:
-            if memory.last_interaction_outcome == "cooperated":
-                coop_prob += 0.25
-                reasons.append("Reciprocating previous kindness")
-            elif memory.last_interaction_outcome == "defected":
-                coop_prob -= 0.25
-                reasons.append("Retaliating against defection")
-        
-        # Ensure bounds
-        coop_prob = max(0, min(1, coop_prob))
+        coop_prob = self._memory_cooperation_probability(memory, stake, reasons)
         
         # Make decision
         move = random.random() < coop_prob
@@ -229,15 +209,140 @@ class Agent:
             
         return move
     
+    def decide_move_batch(self, partner: 'Agent', stake: float, n: int) -> np.ndarray:
+        """Draw n independent decisions against partner at once (True = cooperate)
+        
+        Unlike decide_move this leaves last_decision_reason untouched.
+        """
+        memory = self._relationship_with(partner)
+        if self._attach_code == ATTACH_DISORGANIZED:
+            # Their emotional flux is redrawn for every decision
+            coop_prob = np.fromiter((self._memory_cooperation_probability(memory, stake) for _ in range(n)),
+                                    dtype=float, count=n)
+        else:
+            coop_prob = self._memory_cooperation_probability(memory, stake)
+        return np.random.random(n) < coop_prob
+    
+    def _cooperation_probability(self, partner: 'Agent', stake: float,
+                                 reasons: Optional[List[str]] = None) -> float:
+        """Probability of cooperating with partner, appending the reasons behind it"""
+        return self._memory_cooperation_probability(self._relationship_with(partner), stake, reasons)
+    
+    if HAS_NUMBA:
+        def _memory_cooperation_probability(self, memory: RelationshipMemory, stake: float,
+                                            reasons: Optional[List[str]] = None) -> float:
+            """_cooperation_probability against an already looked-up relationship memory"""
+            flux = random.uniform(-0.3, 0.3) if self._attach_code == ATTACH_DISORGANIZED else 0.0
+            coop_prob, mask = cooperation_prob(
+                memory.trust_score, self.profile.ethics_fairness, self._attach_code,
+                memory.total_games, memory.times_betrayed,
+                Goal.PROFIT in self.profile.goals, Goal.STABILITY in self.profile.goals,
+                self.emotional_state, stake, self.balance, self.profile.risk_tolerance,
+                self.profile.ethics_reciprocity,
+                _OUTCOME_CODES.get(memory.last_interaction_outcome, OUTCOME_NONE), flux
+            )
+            if reasons is not None:
+                while mask:
+                    low_bit = mask & -mask
+                    reasons.append(_REASONS[low_bit.bit_length() - 1].format(partner=memory.partner_name))
+                    mask ^= low_bit
+            return coop_prob
+    else:
+        # Without Numba the kernel call and mask decoding cost more than the arithmetic
+        # itself, so this mirrors kernels.cooperation_prob inline
+        def _memory_cooperation_probability(self, memory: RelationshipMemory, stake: float,
+                                            reasons: Optional[List[str]] = None) -> float:
+            """_cooperation_probability against an already looked-up relationship memory"""
+            if reasons is None:
+                reasons = []
+            profile = self.profile
+            attach = self._attach_code
+            
+            # Base probability of cooperation
+            coop_prob = 0.5
+            reasons.append("Base curiosity")
+            
+            # Trust influence (0-100 -> 0-40%)
+            trust_effect = (memory.trust_score / 100) * 0.4
+            coop_prob += trust_effect
+            if trust_effect > 0.2:
+                reasons.append(f"Strong trust in {memory.partner_name}")
+            elif trust_effect < 0.1:
+                reasons.append(f"Wary of {memory.partner_name}")
+            
+            # Ethics influence
+            coop_prob += profile.ethics_fairness * 0.2
+            if profile.ethics_fairness > 0.7:
+                reasons.append("Valuing fairness")
+            
+            # Attachment style modifiers
+            if attach == ATTACH_SECURE:
+                coop_prob += 0.2
+                reasons.append("Securely building connection")
+            elif attach == ATTACH_ANXIOUS:
+                if memory.total_games < 3:
+                    coop_prob += 0.3
+                    reasons.append("Eager to please (Anxious)")
+                if memory.times_betrayed > 0:
+                    coop_prob -= memory.times_betrayed * 0.15
+                    reasons.append("Hurting from past betrayal")
+            elif attach == ATTACH_AVOIDANT:
+                coop_prob -= 0.3
+                reasons.append("Keeping emotional distance")
+            else:  # DISORGANIZED
+                coop_prob += random.uniform(-0.3, 0.3)
+                reasons.append("Unpredictable emotional flux")
+            
+            # Goal-based modifiers
+            if Goal.PROFIT in profile.goals:
+                coop_prob -= 0.1
+                reasons.append("Prioritizing MON earnings")
+            if Goal.STABILITY in profile.goals:
+                coop_prob += 0.15
+                reasons.append("Seeking long-term stability")
+            
+            # Emotional state influence
+            emotion_mod = (self.emotional_state - 50) / 100 * 0.2
+            coop_prob += emotion_mod
+            if emotion_mod > 0.05:
+                reasons.append("Feeling optimistic")
+            elif emotion_mod < -0.05:
+                reasons.append("Feeling frustrated")
+            
+            # Risk tolerance
+            if stake > self.balance * profile.risk_tolerance:
+                coop_prob -= 0.15
+                reasons.append("Risk is too high for my comfort")
+            
+            # Tit-for-tat strategy (reciprocity)
+            if memory.total_games > 0 and profile.ethics_reciprocity > 0.5:
+                if memory.last_interaction_outcome == "cooperated":
+                    coop_prob += 0.25
+                    reasons.append("Reciprocating previous kindness")
+                elif memory.last_interaction_outcome == "defected":
+                    coop_prob -= 0.25
+                    reasons.append("Retaliating against defection")
+            
+            # Ensure bounds
+            return max(0.0, min(1.0, coop_prob))
+    
+    def _relationship_with(self, partner: 'Agent') -> RelationshipMemory:
+        """Get or create the relationship memory for partner"""
+        memory = self.relationships.get(partner.profile.name)
+        if memory is None:
+            memory = self.relationships[partner.profile.name] = RelationshipMemory(
+                partner_name=partner.profile.name,
+                trust_score=self._initial_trust()
+            )
+        return memory
+    
     def _initial_trust(self) -> float:
         """Get initial trust based on attachment style"""
-        base_trust = {
-            AttachmentStyle.SECURE: 70.0,
-            AttachmentStyle.ANXIOUS: 50.0,
-            AttachmentStyle.AVOIDANT: 30.0,
-            AttachmentStyle.DISORGANIZED: random.uniform(20, 80)
-        }
-        return base_trust.get(self.profile.attachment_style, 50.0)
+        # Drawn for every style, not just DISORGANIZED, so seeded runs stay reproducible
+        random_trust = random.uniform(20, 80)
+        if self._attach_code == ATTACH_DISORGANIZED:
+            return random_trust
+        return _INITIAL_TRUST[self._attach_code]
     
     def calculate_stake(self, partner: 'Agent') -> float:
         """Decide how much to stake based on confidence and risk tolerance"""
@@ -258,13 +363,7 @@ class Agent:
     def update_after_game(self, partner: 'Agent', my_move: bool, partner_move: bool, 
                           my_stake: float, payout: float):
         """Update state after a game completes"""
-        if partner.profile.name not in self.relationships:
-            self.relationships[partner.profile.name] = RelationshipMemory(
-                partner_name=partner.profile.name,
-                trust_score=self._initial_trust()
-            )
-        
-        memory = self.relationships[partner.profile.name]
+        memory = self._relationship_with(partner)
         memory.total_games += 1
         memory.total_earnings += (payout - my_stake)
         
@@ -317,26 +416,7 @@ class Agent:
     
     def _update_trust(self, memory: RelationshipMemory, my_move: bool, partner_move: bool):
         """Update trust score based on interaction outcome"""
-        if my_move and partner_move:
-            # Mutual cooperation - trust increases
-            delta = 5.0
-        elif not my_move and not partner_move:
-            # Mutual defection - trust decreases slightly
-            delta = -2.0
-        elif my_move and not partner_move:
-            # Betrayed - trust decreases significantly
-            delta = -15.0
-            # Attachment style affects reaction
-            if self.profile.attachment_style == AttachmentStyle.ANXIOUS:
-                delta *= 2.0  # Dramatic reaction
-            elif self.profile.attachment_style == AttachmentStyle.AVOIDANT:
-                delta *= 0.5  # Minimal reaction
-        else:
-            # Exploited partner - trust decreases (guilt)
-            delta = -5.0
-        
-        memory.trust_score += delta
-        memory.trust_score = max(0, min(100, memory.trust_score))
+        memory.trust_score = trust_update(memory.trust_score, my_move, partner_move, self._attach_code)
     
     def _update_bond(self, memory: RelationshipMemory, my_move: bool, partner_move: bool):
         """Update bond strength"""
@@ -360,7 +440,7 @@ class Agent:
         
         # Betrayal affects emotion
         if my_move and not partner_move:
-            if self.profile.attachment_style == AttachmentStyle.ANXIOUS:
+            if self._attach_code == ATTACH_ANXIOUS:
                 self.emotional_state -= 20.0  # Dramatic response
             else:
                 self.emotional_state -= 10.0
@@ -396,15 +476,12 @@ class Agent:
         if not memory:
             return True
         
-        # Attachment style influences rematching
-        if self.profile.attachment_style == AttachmentStyle.SECURE:
-            return memory.trust_score > 40  # Willing if trust recovers
-        elif self.profile.attachment_style == AttachmentStyle.ANXIOUS:
-            return memory.trust_score > 20  # Desperate to reconnect
-        elif self.profile.attachment_style == AttachmentStyle.AVOIDANT:
-            return memory.trust_score > 70  # Rarely rematch
-        else:  # DISORGANIZED
+        # DISORGANIZED agents decide afresh every time
+        if self._attach_code == ATTACH_DISORGANIZED:
             return random.random() > 0.5  # Random
+        
+        # Attachment style influences rematching
+        return memory.trust_score > _REMATCH_TRUST[self._attach_code]
     
     def __repr__(self):
         return f"Agent({self.profile.name}, {self.profile.attachment_style.value}, Balance: {self.balance:.2f})"
@@ -27,7 +27,7 @@ def create_agent_population(num_agents: int = 10, initial_balance: float = 10.0)
     for i in range(min(num_agents, len(names))):
         # Random goals (1-3 goals per agent)
         num_goals = random.randint(1, 3)
-        goals = random.sample(list(Goal), num_goals)
+        goals = tuple(random.sample(list(Goal), num_goals))
         
         # Generate a unique wallet for each agent
         from eth_account import Account
@@ -44,7 +44,7 @@ def create_agent_population(num_agents: int = 10, initial_balance: float = 10.0)
             skill_negotiation=random.uniform(0.3, 0.9),
             skill_patience=random.uniform(0.3, 0.9),
             skill_adaptability=random.uniform(0.3, 0.9),
-            preferred_partner_goals=random.sample(list(Goal), random.randint(1, 2)),
+            preferred_partner_goals=tuple(random.sample(list(Goal), random.randint(1, 2))),
             preferred_trust_threshold=random.uniform(30, 70),
             address=acct.address,
             private_key=acct.key.hex(),
@@ -1,11 +1,15 @@
 """
 Blockchain integration for agent transactions on Monad
 """
+from hexbytes import HexBytes
 from web3 import Web3
-from typing import Optional, Dict, Tuple
+from web3.exceptions import TimeExhausted
+from typing import Any, Optional, Dict, Iterator, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
 import hashlib
 import secrets
+import time
 
 class BlockchainIntegration:
     """Handles all Monad blockchain interactions"""
@@ -74,43 +78,201 @@ class BlockchainIntegration:
                 return error_str.split("execution reverted:")[1].strip()
             return error_str
     
-    def create_game(self, agent1_private_key: str, agent2_address: str, stake_wei: int) -> Tuple[Optional[int], str]:
-        """Create a new game on-chain"""
-        agent1_account = self.w3.eth.account.from_key(agent1_private_key)
-        agent1_address = agent1_account.address
+    def begin_round(self, addresses: List[str]) -> Dict:
+        """Fetch fees and every account's pending nonce in one batch, for reuse across a round
         
-        # Prepare transaction parameters
+        Pass the returned context to the build_* methods; they take nonces from it and
+        advance them locally instead of querying the node for every transaction.
+        """
         base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
         priority_fee = self.w3.eth.max_priority_fee
-        max_fee = base_fee * 2 + priority_fee
+        
+        checksummed = [Web3.to_checksum_address(a) for a in addresses]
+        try:
+            with self.w3.batch_requests() as batch:
+                for address in checksummed:
+                    batch.add(self.w3.eth.get_transaction_count(address, 'pending'))
+                nonces = batch.execute()
+        except Exception as e:
+            print(f"Batch nonce request failed, falling back to single calls: {e}")
+            nonces = [self.w3.eth.get_transaction_count(address, 'pending') for address in checksummed]
+        
+        return {
+            'max_fee': base_fee * 2 + priority_fee,
+            'priority_fee': priority_fee,
+            'nonces': dict(zip(checksummed, nonces)),
+        }
+    
+    def _build_transaction(self, fn_name: str, contract_fn, private_key: str,
+                           fallback_gas: int, value: int = 0, round_ctx: Optional[Dict] = None) -> Dict:
+        """Fill fees, nonce and gas for a contract call sent from the given key"""
+        address = self.w3.eth.account.from_key(private_key).address
+        
+        # Prepare transaction parameters
+        if round_ctx is not None:
+            max_fee = round_ctx['max_fee']
+            priority_fee = round_ctx['priority_fee']
+            nonce = round_ctx['nonces'][address]
+            round_ctx['nonces'][address] = nonce + 1
+        else:
+            base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
+            priority_fee = self.w3.eth.max_priority_fee
+            max_fee = base_fee * 2 + priority_fee
+            nonce = self.w3.eth.get_transaction_count(address)
         
         tx_params = {
-            'from': agent1_address,
-            'value': stake_wei,
-            'nonce': self.w3.eth.get_transaction_count(agent1_address),
+            'from': address,
+            'nonce': nonce,
             'chainId': 143,
             'maxFeePerGas': max_fee,
             'maxPriorityFeePerGas': priority_fee
         }
+        if value:
+            tx_params['value'] = value
         
         # Estimate gas
         try:
-            gas_estimate = self.contract.functions.createGame(
-                Web3.to_checksum_address(agent2_address)
-            ).estimate_gas(tx_params)
+            gas_estimate = contract_fn.estimate_gas(tx_params)
             tx_params['gas'] = int(gas_estimate * 1.2)
         except Exception as e:
-            print(f"Gas estimation failed for createGame: {e}")
-            tx_params['gas'] = 300000
+            print(f"Gas estimation failed for {fn_name}: {e}")
+            tx_params['gas'] = fallback_gas
+        
+        return contract_fn.build_transaction(tx_params)
+    
+    def build_create_game(self, agent1_private_key: str, agent2_address: str, stake_wei: int,
+                          round_ctx: Optional[Dict] = None) -> Dict:
+        """Build an unsigned createGame transaction"""
+        contract_fn = self.contract.functions.createGame(Web3.to_checksum_address(agent2_address))
+        return self._build_transaction('createGame', contract_fn, agent1_private_key, 300000, stake_wei, round_ctx)
+    
+    def build_join_game(self, game_id: int, agent2_private_key: str, stake_wei: int,
+                        round_ctx: Optional[Dict] = None) -> Dict:
+        """Build an unsigned joinGame transaction"""
+        contract_fn = self.contract.functions.joinGame(game_id)
+        return self._build_transaction('joinGame', contract_fn, agent2_private_key, 200000, stake_wei, round_ctx)
+    
+    def build_commit_move(self, game_id: int, agent_private_key: str, cooperate: bool,
+                          round_ctx: Optional[Dict] = None) -> Tuple[Dict, str]:
+        """Build an unsigned commitMove transaction (returns transaction and salt for reveal)"""
+        # Generate random salt
+        salt = secrets.token_hex(32)
+        
+        # Create hash
+        move_hash = Web3.solidity_keccak(['bool', 'string'], [cooperate, salt])
+        
+        contract_fn = self.contract.functions.commitMove(game_id, move_hash)
+        return self._build_transaction('commitMove', contract_fn, agent_private_key, 150000, round_ctx=round_ctx), salt
+    
+    def build_reveal_move(self, game_id: int, agent_private_key: str, cooperate: bool, salt: str,
+                          round_ctx: Optional[Dict] = None) -> Dict:
+        """Build an unsigned revealMove transaction"""
+        contract_fn = self.contract.functions.revealMove(game_id, cooperate, salt)
+        return self._build_transaction('revealMove', contract_fn, agent_private_key, 250000, round_ctx=round_ctx)
+    
+    def game_id_from_receipt(self, receipt) -> Optional[int]:
+        """Extract the game ID from a createGame receipt"""
+        logs = self.contract.events.GameCreated().process_receipt(receipt)
+        if logs:
+            # The first GameCreated event in createGame has stake2 = 0
+            return logs[0]['args']['gameId']
+        return None
+    
+    def poll_receipts_batched(self, tx_hashes: List, timeout: float = 120,
+                              poll_latency: float = 0.1) -> List:
+        """Wait for several transactions, polling all pending receipts in one JSON-RPC batch per cycle"""
+        hex_hashes = [Web3.to_hex(h) for h in tx_hashes]
+        pending = list(dict.fromkeys(hex_hashes))
+        deadline = time.monotonic() + timeout
+        
+        while pending:
+            try:
+                responses = self.w3.provider.make_batch_request(
+                    [('eth_getTransactionReceipt', [h]) for h in pending]
+                )
+                if not isinstance(responses, list):
+                    raise Exception(responses.get('error', responses))
+            except Exception as e:
+                # Not every RPC endpoint accepts batches; wait on each receipt instead
+                print(f"Batch receipt polling failed, falling back to single calls: {e}")
+                by_hash = {h: self.w3.eth.wait_for_transaction_receipt(h, timeout=timeout) for h in dict.fromkeys(hex_hashes)}
+                return [by_hash[h] for h in hex_hashes]
             
-        transaction = self.contract.functions.createGame(
-            Web3.to_checksum_address(agent2_address)
-        ).build_transaction(tx_params)
+            pending = [h for h, r in zip(pending, responses) if r.get('result') is None]
+            if pending:
+                if time.monotonic() > deadline:
+                    raise TimeExhausted(f"Transactions {pending} not mined after {timeout} seconds")
+                time.sleep(poll_latency)
         
+        # Everything is mined; fetch the formatted receipts together
+        unique = list(dict.fromkeys(hex_hashes))
+        with self.w3.batch_requests() as batch:
+            for h in unique:
+                batch.add(self.w3.eth.get_transaction_receipt(h))
+            by_hash = dict(zip(unique, batch.execute()))
+        return [by_hash[h] for h in hex_hashes]
+    
+    def transact_batched(self, transactions: List[Tuple[Dict, str]]) -> List[Tuple[Optional[str], Any, Optional[str]]]:
+        """Sign and broadcast (transaction, private_key) pairs in one batch, then wait for every receipt
+        
+        Returns (tx_hash, receipt, error) per transaction, in order; error is set when the
+        transaction could not be broadcast or reverted.
+        """
+        raw_txs = [self.w3.eth.account.sign_transaction(tx, key).raw_transaction for tx, key in transactions]
+        sent = []
         try:
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, agent1_private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            # web3's batch_requests() refuses eth_sendRawTransaction, so batch at the provider
+            responses = self.w3.provider.make_batch_request(
+                [('eth_sendRawTransaction', [Web3.to_hex(raw)]) for raw in raw_txs]
+            )
+            if not isinstance(responses, list):
+                raise Exception(responses.get('error', responses))
+            for response in responses:
+                if 'error' in response:
+                    print(f"Transaction broadcasting failed: {response['error']}")
+                    sent.append(Exception(f"Broadcasting failed: {response['error']}"))
+                else:
+                    sent.append(HexBytes(response['result']))
+        except Exception as e:
+            # Not every RPC endpoint accepts batches; send one at a time instead
+            print(f"Batch broadcast failed, falling back to single sends: {e}")
+            sent = []
+            for raw in raw_txs:
+                try:
+                    sent.append(self.w3.eth.send_raw_transaction(raw))
+                except Exception as send_error:
+                    print(f"Transaction broadcasting failed: {send_error}")
+                    sent.append(Exception(f"Broadcasting failed: {send_error}"))
+        
+        mined = [h for h in sent if not isinstance(h, Exception)]
+        receipts = iter(self.poll_receipts_batched(mined)) if mined else iter(())
+        
+        results = []
+        for (transaction, _), tx_hash in zip(transactions, sent):
+            if isinstance(tx_hash, Exception):
+                results.append((None, None, str(tx_hash)))
+                continue
+            receipt = next(receipts)
+            error = None
+            if receipt.status != 1:
+                reason = self._get_revert_reason(transaction)
+                print(f"❌ Transaction reverted: {reason}")
+                error = f"Revert: {reason} ({Web3.to_hex(tx_hash)})"
+            results.append((Web3.to_hex(tx_hash), receipt, error))
+        return results
+    
+    def _transact(self, transaction: Dict, private_key: str):
+        """Sign, broadcast and wait for a single transaction"""
+        signed_txn = self.w3.eth.account.sign_transaction(transaction, private_key)
+        tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        return tx_hash, self.poll_receipts_batched([tx_hash])[0]
+    
+    def create_game(self, agent1_private_key: str, agent2_address: str, stake_wei: int) -> Tuple[Optional[int], str]:
+        """Create a new game on-chain"""
+        transaction = self.build_create_game(agent1_private_key, agent2_address, stake_wei)
+        
+        try:
+            tx_hash, receipt = self._transact(transaction, agent1_private_key)
             
             if receipt.status != 1:
                 reason = self._get_revert_reason(transaction)
@@ -118,50 +280,17 @@ class BlockchainIntegration:
                 return None, f"Revert: {reason} ({Web3.to_hex(tx_hash)})"
                 
             # Extract game ID from logs
-            logs = self.contract.events.GameCreated().process_receipt(receipt)
-            if logs:
-                # The first GameCreated event in createGame has stake2 = 0
-                game_id = logs[0]['args']['gameId']
-                return game_id, Web3.to_hex(tx_hash)
-            
-            return None, Web3.to_hex(tx_hash)
+            return self.game_id_from_receipt(receipt), Web3.to_hex(tx_hash)
         except Exception as e:
             print(f"Transaction broadcasting failed: {e}")
             return None, f"Error: {str(e)}"
     
     def join_game(self, game_id: int, agent2_private_key: str, stake_wei: int) -> str:
         """Agent 2 joins the game with their stake"""
-        agent2_account = self.w3.eth.account.from_key(agent2_private_key)
-        agent2_address = agent2_account.address
+        transaction = self.build_join_game(game_id, agent2_private_key, stake_wei)
         
-        # Prepare transaction parameters
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        priority_fee = self.w3.eth.max_priority_fee
-        max_fee = base_fee * 2 + priority_fee
-        
-        tx_params = {
-            'from': agent2_address,
-            'value': stake_wei,
-            'nonce': self.w3.eth.get_transaction_count(agent2_address),
-            'chainId': 143,
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': priority_fee
-        }
-        
-        # Estimate gas
         try:
-            gas_estimate = self.contract.functions.joinGame(game_id).estimate_gas(tx_params)
-            tx_params['gas'] = int(gas_estimate * 1.2)
-        except Exception as e:
-            print(f"Gas estimation failed for joinGame: {e}")
-            tx_params['gas'] = 200000
-            
-        transaction = self.contract.functions.joinGame(game_id).build_transaction(tx_params)
-        
-        try:
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, agent2_private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_hash, receipt = self._transact(transaction, agent2_private_key)
             
             if receipt.status != 1:
                 reason = self._get_revert_reason(transaction)
@@ -175,42 +304,10 @@ class BlockchainIntegration:
     
     def commit_move(self, game_id: int, agent_private_key: str, cooperate: bool) -> Tuple[str, str]:
         """Commit a move using hash (returns tx_hash and salt for reveal)"""
-        agent_account = self.w3.eth.account.from_key(agent_private_key)
-        agent_address = agent_account.address
-        
-        # Generate random salt
-        salt = secrets.token_hex(32)
-        
-        # Create hash
-        move_hash = Web3.solidity_keccak(['bool', 'string'], [cooperate, salt])
-        
-        # Prepare transaction parameters
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        priority_fee = self.w3.eth.max_priority_fee
-        max_fee = base_fee * 2 + priority_fee
+        transaction, salt = self.build_commit_move(game_id, agent_private_key, cooperate)
         
-        tx_params = {
-            'from': agent_address,
-            'nonce': self.w3.eth.get_transaction_count(agent_address),
-            'chainId': 143,
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': priority_fee
-        }
-        
-        # Estimate gas
         try:
-            gas_estimate = self.contract.functions.commitMove(game_id, move_hash).estimate_gas(tx_params)
-            tx_params['gas'] = int(gas_estimate * 1.2)
-        except Exception as e:
-            print(f"Gas estimation failed for commitMove: {e}")
-            tx_params['gas'] = 150000
-            
-        transaction = self.contract.functions.commitMove(game_id, move_hash).build_transaction(tx_params)
-        
-        try:
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, agent_private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_hash, receipt = self._transact(transaction, agent_private_key)
             
             if receipt.status != 1:
                 reason = self._get_revert_reason(transaction)
@@ -224,40 +321,10 @@ class BlockchainIntegration:
     
     def reveal_move(self, game_id: int, agent_private_key: str, cooperate: bool, salt: str) -> str:
         """Reveal a move"""
-        agent_account = self.w3.eth.account.from_key(agent_private_key)
-        agent_address = agent_account.address
+        transaction = self.build_reveal_move(game_id, agent_private_key, cooperate, salt)
         
-        # Prepare transaction parameters
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        priority_fee = self.w3.eth.max_priority_fee
-        max_fee = base_fee * 2 + priority_fee
-        
-        tx_params = {
-            'from': agent_address,
-            'nonce': self.w3.eth.get_transaction_count(agent_address),
-            'chainId': 143,
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': priority_fee
-        }
-        
-        # Estimate gas
         try:
-            gas_estimate = self.contract.functions.revealMove(
-                game_id, cooperate, salt
-            ).estimate_gas(tx_params)
-            tx_params['gas'] = int(gas_estimate * 1.2)
-        except Exception as e:
-            print(f"Gas estimation failed for revealMove: {e}")
-            tx_params['gas'] = 250000
-            
-        transaction = self.contract.functions.revealMove(
-            game_id, cooperate, salt
-        ).build_transaction(tx_params)
-        
-        try:
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, agent_private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_hash, receipt = self._transact(transaction, agent_private_key)
             
             if receipt.status != 1:
                 reason = self._get_revert_reason(transaction)
@@ -269,9 +336,8 @@ class BlockchainIntegration:
             print(f"Reveal move broadcasting failed: {e}")
             raise Exception(f"Broadcasting failed: {e}")
     
-    def get_game(self, game_id: int) -> Dict:
-        """Get game details from contract"""
-        game = self.contract.functions.getGame(game_id).call()
+    @staticmethod
+    def _game_to_dict(game) -> Dict:
         return {
             'agent1': game[0],
             'agent2': game[1],
@@ -282,11 +348,42 @@ class BlockchainIntegration:
             'agent2_cooperated': game[9]
         }
     
+    def get_game(self, game_id: int) -> Dict:
+        """Get game details from contract"""
+        return self._game_to_dict(self.contract.functions.getGame(game_id).call())
+    
+    def get_games(self, game_ids: List[int]) -> List[Dict]:
+        """Get details of several games in one JSON-RPC batch round-trip"""
+        try:
+            with self.w3.batch_requests() as batch:
+                for game_id in game_ids:
+                    batch.add(self.contract.functions.getGame(game_id))
+                games = batch.execute()
+        except Exception as e:
+            print(f"Batch game request failed, falling back to single calls: {e}")
+            games = [self.contract.functions.getGame(game_id).call() for game_id in game_ids]
+        return [self._game_to_dict(game) for game in games]
+    
     def get_balance(self, address: str) -> float:
         """Get MON balance of address"""
         balance_wei = self.w3.eth.get_balance(Web3.to_checksum_address(address))
         return self.w3.from_wei(balance_wei, 'ether')
     
+    def get_balances(self, addresses: List[str]) -> List[float]:
+        """Get MON balances of many addresses in one JSON-RPC batch round-trip"""
+        checksummed = [Web3.to_checksum_address(a) for a in addresses]
+        try:
+            with self.w3.batch_requests() as batch:
+                for address in checksummed:
+                    batch.add(self.w3.eth.get_balance(address))
+                balances_wei = batch.execute()
+        except Exception as e:
+            # Not every RPC endpoint accepts batches; overlap single calls instead
+            print(f"Batch balance request failed, falling back to concurrent calls: {e}")
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                balances_wei = list(executor.map(self.w3.eth.get_balance, checksummed))
+        return [float(self.w3.from_wei(b, 'ether')) for b in balances_wei]
+    
     def fund_agent(self, agent_address: str, amount_eth: float) -> str:
         """Send MON to agent address"""
         # Prepare transaction parameters
@@ -309,13 +406,58 @@ class BlockchainIntegration:
             tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
             
             # Wait for receipt to ensure nonce increments for the next call in a loop
-            self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            self.poll_receipts_batched([tx_hash])
             
             return Web3.to_hex(tx_hash)
         except Exception as e:
             print(f"Funding broadcasting failed: {e}")
             raise Exception(f"Broadcasting failed: {e}")
     
+    def fund_agents(self, agent_addresses: List[str], amount_eth: float,
+                    max_workers: int = 10) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+        """Send MON to several agents, yielding (address, tx_hash, error) as each transfer confirms"""
+        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
+        priority_fee = self.w3.eth.max_priority_fee
+        max_fee = base_fee * 2 + priority_fee
+        value = self.w3.to_wei(amount_eth, 'ether')
+        
+        # Fetch the nonce once and assign consecutive nonces locally
+        nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        
+        # Broadcast in nonce order; sending is a single fast RPC and keeps nonces gap-free
+        pending = {}
+        for address in agent_addresses:
+            transaction = {
+                'to': Web3.to_checksum_address(address),
+                'value': value,
+                'gas': 21000,
+                'maxFeePerGas': max_fee,
+                'maxPriorityFeePerGas': priority_fee,
+                'nonce': nonce,
+                'chainId': 143
+            }
+            try:
+                signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+                pending[address] = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                nonce += 1
+            except Exception as e:
+                print(f"Funding broadcasting failed: {e}")
+                yield address, None, Exception(f"Broadcasting failed: {e}")
+        
+        # Wait for all receipts concurrently so confirmation time overlaps
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.w3.eth.wait_for_transaction_receipt, tx_hash): address
+                for address, tx_hash in pending.items()
+            }
+            for future in as_completed(futures):
+                address = futures[future]
+                try:
+                    future.result()
+                    yield address, Web3.to_hex(pending[address]), None
+                except Exception as e:
+                    yield address, Web3.to_hex(pending[address]), e
+    
     def simulate_game_offchain(self, agent1_move: bool, agent2_move: bool, 
                                stake1: float, stake2: float) -> Tuple[float, float]:
         """Simulate game payoffs without touching blockchain (for dashboard simulation)"""
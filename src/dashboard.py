@@ -3,23 +3,28 @@ Streamlit dashboard for visualizing autonomous agent dating economy
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import networkx as nx
-from typing import List
-import time
+from typing import List, Dict, Tuple
 import os
+import statistics
+import uuid
 from dotenv import load_dotenv
 
 from agent import Agent, AttachmentStyle
-from game_engine import GameEngine
+from game_engine import GameEngine, configure_logging
 from agent_utils import create_agent_population, get_agent_summary, get_relationship_summary
 from blockchain import BlockchainIntegration
 
 # Load environment variables
 load_dotenv()
 
+# Show on-chain progress in the server console, as the engine used to print it
+configure_logging()
+
 # Page configuration
 st.set_page_config(
     page_title="AI Agent Dating Economy",
@@ -27,21 +32,117 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_analytics(sim_id: str, round_count: int, _engine: GameEngine,
+                    _agents: List[Agent]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Aggregate match history and agent state for the Analytics tab.
+
+    Only ``sim_id`` and ``round_count`` are hashed (Streamlit skips arguments
+    with a leading underscore), so reruns without new games hit the cache.
+    """
+    history_df = _engine.match_history_df
+    
+    # Cooperation rate per match, vectorized over the whole history
+    # Number of cooperating agents per match (0-2), halved after the rolling mean
+    coop = ((history_df['agent1_move'].values == 'cooperate').view(np.int8) +
+            (history_df['agent2_move'].values == 'cooperate').view(np.int8))
+    window = max(1, len(history_df) // 5)
+    history_df = history_df.assign(
+        rolling_coop=pd.Series(coop, index=history_df.index).rolling(window=window, min_periods=1).mean() * 0.5
+    )
+    
+    trust_data = []
+    for agent in _agents:
+        for partner_name, memory in agent.relationships.items():
+            if memory.total_games > 0:
+                trust_data.append({
+                    'Agent': agent.profile.name,
+                    'Style': agent.profile.attachment_style.value,
+                    'Trust': memory.trust_score
+                })
+    trust_df = pd.DataFrame(trust_data)
+    if not trust_df.empty:
+        trust_df['Style'] = pd.Categorical(trust_df['Style'], categories=[style.value for style in AttachmentStyle])
+    
+    ethics_df = pd.DataFrame([{
+        'Agent': agent.profile.name,
+        'Style': agent.profile.attachment_style.value,
+        'Fairness': agent.profile.ethics_fairness
+    } for agent in _agents])
+    
+    return history_df, trust_df, ethics_df
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_coop_fig(sim_id: str, round_count: int, _history_df: pd.DataFrame) -> go.Figure:
+    """Rolling global cooperation rate chart"""
+    window = max(1, len(_history_df) // 5)
+    fig_coop = px.line(_history_df, y='rolling_coop', title=f"Global Cooperation Trend (Rolling Window: {window})")
+    fig_coop.update_layout(yaxis_range=[0, 1])
+    return fig_coop
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_trust_fig(sim_id: str, round_count: int, _trust_df: pd.DataFrame) -> go.Figure:
+    """Trust score distribution per attachment style"""
+    return px.box(_trust_df, x='Style', y='Trust', color='Style', 
+                  points="all", title="Trust Score Distribution by Attachment Style")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_ethics_fig(sim_id: str, round_count: int, _ethics_df: pd.DataFrame) -> go.Figure:
+    """Current fairness level per agent"""
+    return px.bar(_ethics_df, x='Agent', y='Fairness', color='Style', 
+                  title="Current Ethics (Fairness) Level (Learned from experience)")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_leaderboard_df(summaries: List[Dict]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Agent summaries sorted by balance and by reputation.
+
+    Hashed on the summaries themselves so a balance sync without a new
+    round still invalidates the entry.
+    """
+    df = pd.DataFrame(summaries)
+    return df.sort_values('balance', ascending=False), df.sort_values('reputation', ascending=False)
+
+@st.cache_resource(show_spinner=False)
+def get_blockchain(rpc_url: str, private_key: str, contract_address: str) -> BlockchainIntegration:
+    """Blockchain client shared by every session, so the Web3 connection pool is reused"""
+    return BlockchainIntegration(rpc_url, private_key, contract_address)
+
+@st.cache_data(ttl=30, show_spinner="Syncing balances...")
+def fetch_balances(addresses: Tuple[str, ...], round_count: int,
+                   _blockchain: BlockchainIntegration) -> Dict[str, float]:
+    """On-chain MON balance per address, reused for 30s or until another round is played"""
+    return dict(zip(addresses, _blockchain.get_balances(list(addresses))))
+
+def sync_balances():
+    """Overwrite every agent's balance with its (cached) on-chain balance"""
+    balances = fetch_balances(
+        tuple(agent.profile.address for agent in st.session_state.agents),
+        st.session_state.round_count,
+        st.session_state.blockchain
+    )
+    for agent in st.session_state.agents:
+        agent.balance = balances[agent.profile.address]
+    st.session_state.engine.refresh_agent_state()
+
+def run_matchmaking_round():
+    """Pair up agents and play one game per match"""
+    matches = st.session_state.engine.create_matches()
+    results = st.session_state.engine.run_rounds_batch(matches)
+    st.session_state.round_count += len(results)
+
 # Initialize session state
 if 'blockchain' not in st.session_state:
     rpc_url = os.getenv("MONAD_RPC_URL", "https://rpc.monad.xyz")
     private_key = os.getenv("PRIVATE_KEY", "")
     contract_address = os.getenv("CONTRACT_ADDRESS", "")
     
-    if private_key:
-        st.session_state.blockchain = BlockchainIntegration(rpc_url, private_key, contract_address)
-    else:
-        st.session_state.blockchain = None
+    st.session_state.blockchain = get_blockchain(rpc_url, private_key, contract_address) if private_key else None
 
 if 'agents' not in st.session_state:
     st.session_state.agents = create_agent_population(10, 10.0)
     st.session_state.engine = GameEngine(st.session_state.agents, st.session_state.blockchain)
     st.session_state.round_count = 0
+    st.session_state.sim_id = uuid.uuid4().hex
     st.session_state.auto_run = False
     st.session_state.blockchain_mode = False
     st.session_state.funding_hashes = []
@@ -56,11 +157,7 @@ with st.sidebar:
     st.header("🎮 Controls")
     
     if st.button("▶️ Run Single Round", use_container_width=True):
-        matches = st.session_state.engine.create_matches()
-        for agent1, agent2 in matches:
-            result = st.session_state.engine.run_round(agent1, agent2)
-            if result:
-                st.session_state.round_count += 1
+        run_matchmaking_round()
         st.rerun()
     
     st.session_state.auto_run = st.toggle("🔄 Auto-Run", value=st.session_state.auto_run)
@@ -75,12 +172,9 @@ with st.sidebar:
             st.session_state.engine.blockchain = st.session_state.blockchain if new_mode else None
             
             if new_mode:
-                with st.spinner("Initial balance sync..."):
-                    for agent in st.session_state.agents:
-                        try:
-                            balance_wei = st.session_state.blockchain.w3.eth.get_balance(agent.profile.address)
-                            agent.balance = float(st.session_state.blockchain.w3.from_wei(balance_wei, 'ether'))
-                        except: pass
+                try:
+                    sync_balances()
+                except: pass
             st.rerun()
         
         if st.session_state.blockchain_mode:
@@ -88,30 +182,36 @@ with st.sidebar:
             
             # Balance Sync for Blockchain Mode
             if st.button("🔄 Sync On-Chain Balances", use_container_width=True):
-                with st.spinner("Fetching balances..."):
-                    for agent in st.session_state.agents:
-                        try:
-                            balance_wei = st.session_state.blockchain.w3.eth.get_balance(agent.profile.address)
-                            agent.balance = float(st.session_state.blockchain.w3.from_wei(balance_wei, 'ether'))
-                        except Exception as e:
-                            st.error(f"Failed to sync for {agent.profile.name}: {e}")
+                # An explicit sync must not be served from the cache (e.g. right after funding)
+                fetch_balances.clear()
+                try:
+                    sync_balances()
+                except Exception as e:
+                    st.error(f"Failed to sync balances: {e}")
                 st.success("Balances synchronized!")
                 st.rerun()
 
             if st.button("💰 Fund Agents (MON)", use_container_width=True):
                 st.session_state.funding_hashes = [] # Clear previous hashes
                 with st.status("Distributing MON to agents...") as status:
-                    for i, agent in enumerate(st.session_state.agents):
-                        try:
-                            status.update(label=f"Broadcasting to {agent.profile.name} ({i+1}/{len(st.session_state.agents)})...")
-                            tx_hash = st.session_state.blockchain.fund_agent(agent.profile.address, 0.1)
+                    agents_by_address = {a.profile.address: a for a in st.session_state.agents}
+                    total = len(agents_by_address)
+                    status.update(label=f"Broadcasting to {total} agents...")
+                    try:
+                        results = st.session_state.blockchain.fund_agents(list(agents_by_address), 0.1)
+                        for i, (address, tx_hash, error) in enumerate(results):
+                            agent = agents_by_address[address]
+                            status.update(label=f"Confirming transfers ({i+1}/{total})...")
+                            if error:
+                                st.error(f"❌ Failed to fund {agent.profile.name}: {error}")
+                                continue
                             st.session_state.funding_hashes.append({
                                 'name': agent.profile.name,
                                 'hash': tx_hash
                             })
                             st.write(f"✅ {agent.profile.name}: Confirmed ([View](https://monadvision.com/tx/{tx_hash}))")
-                        except Exception as e:
-                            st.error(f"❌ Failed to fund {agent.profile.name}: {e}")
+                    except Exception as e:
+                        st.error(f"❌ Funding failed: {e}")
                     status.update(label="Funding Complete!", state="complete")
                     status.update(label="Funding complete!", state="complete")
                 st.success("Agents funding process finished!")
@@ -128,6 +228,7 @@ with st.sidebar:
         st.session_state.agents = create_agent_population(10, 10.0)
         st.session_state.engine = GameEngine(st.session_state.agents)
         st.session_state.round_count = 0
+        st.session_state.sim_id = uuid.uuid4().hex
         st.rerun()
     
     st.divider()
@@ -135,26 +236,24 @@ with st.sidebar:
     st.metric("Total Games", len(st.session_state.engine.match_history))
     st.metric("Active Bonds", len(st.session_state.engine.active_bonds))
 
-# Main dashboard
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["👥 Agent Profiles", "🕸️ Relationship Network", "📊 Match Feed", "🏆 Leaderboard", "📈 Analytics"])
+# Attachment style colors
+style_colors = {
+    'secure': '#28a745',
+    'anxious': '#ffc107',
+    'avoidant': '#dc3545',
+    'disorganized': '#6c757d'
+}
 
-with tab1:
+@st.fragment
+def render_agent_profiles(summaries: List[Dict]):
+    """Agent profile cards"""
 # ... (lines 100-153)
     st.header("Agent Profiles")
     
-    # Attachment style colors
-    style_colors = {
-        'secure': '#28a745',
-        'anxious': '#ffc107',
-        'avoidant': '#dc3545',
-        'disorganized': '#6c757d'
-    }
-    
     # Display agents in grid
     cols = st.columns(2)
-    for idx, agent in enumerate(st.session_state.agents):
+    for idx, summary in enumerate(summaries):
         with cols[idx % 2]:
-            summary = get_agent_summary(agent)
             color = style_colors[summary['attachment']]
             
             with st.container(border=True):
@@ -193,37 +292,48 @@ with tab1:
                 st.markdown("**Wallet:**")
                 st.code(f"{summary['address']}", language="text")
 
-with tab2:
+@st.fragment
+def render_relationship_network(summaries: List[Dict]):
+    """Relationship graph of agents with shared games"""
     st.header("Relationship Network")
     
     # Build network graph
     G = nx.Graph()
     
     # Add nodes
-    for agent in st.session_state.agents:
-        summary = get_agent_summary(agent)
-        G.add_node(summary['name'], 
-                  attachment=summary['attachment'],
-                  balance=summary['balance'])
+    G.add_nodes_from(
+        (summary['name'], {'attachment': summary['attachment'], 'balance': summary['balance']})
+        for summary in summaries
+    )
     
-    # Add edges for relationships
-    edge_data = []
+    # Add edges for relationships (only once per pair)
+    seen_pairs = set()
+    edges = []
     for agent in st.session_state.agents:
+        name = agent.profile.name
         for partner_name, memory in agent.relationships.items():
-            if memory.total_games > 0:
-                # Only add edge once
-                if agent.profile.name < partner_name:
-                    G.add_edge(agent.profile.name, partner_name,
-                             weight=memory.bond_strength,
-                             trust=memory.trust_score,
-                             games=memory.total_games)
+            pair = frozenset((name, partner_name))
+            if memory.total_games == 0 or pair in seen_pairs:
+                continue
+            seen_pairs.add(pair)
+            edges.append((name, partner_name, {
+                'weight': memory.bond_strength,
+                'trust': memory.trust_score,
+                'games': memory.total_games
+            }))
+    G.add_edges_from(edges)
     
     if len(G.edges()) > 0:
-        # Create network visualization
-        pos = nx.spring_layout(G, k=0.5, iterations=50)
+        # Reuse the cached layout unless the set of edges changed
+        edges_key = hash(tuple(sorted(tuple(sorted(edge)) for edge in G.edges())))
+        cached_key, pos = st.session_state.get('_layout_cache', (None, None))
+        if cached_key != edges_key:
+            pos = nx.spring_layout(G, k=0.5, iterations=50)
+            st.session_state._layout_cache = (edges_key, pos)
         
-        # Create edge traces
-        edge_traces = []
+        # Create edge traces: one trace per health bucket, segments split by None
+        buckets = {color: {'x': [], 'y': [], 'text': [], 'weights': []}
+                   for color in ('green', 'orange', 'red')}
         for edge in G.edges(data=True):
             x0, y0 = pos[edge[0]]
             x1, y1 = pos[edge[1]]
@@ -239,16 +349,25 @@ with tab2:
             else:
                 color = 'red'
             
-            edge_trace = go.Scatter(
-                x=[x0, x1, None],
-                y=[y0, y1, None],
+            text = f"Trust: {trust:.1f}<br>Bond: {weight:.1f}<br>Games: {edge[2].get('games', 0)}"
+            bucket = buckets[color]
+            bucket['x'] += [x0, x1, None]
+            bucket['y'] += [y0, y1, None]
+            bucket['text'] += [text, text, None]
+            bucket['weights'].append(weight)
+        
+        edge_traces = [
+            go.Scatter(
+                x=bucket['x'],
+                y=bucket['y'],
                 mode='lines',
-                line=dict(width=weight/10, color=color),
+                line=dict(width=statistics.median(bucket['weights'])/10, color=color),
                 hoverinfo='text',
-                text=f"Trust: {trust:.1f}<br>Bond: {weight:.1f}<br>Games: {edge[2].get('games', 0)}",
+                text=bucket['text'],
                 showlegend=False
             )
-            edge_traces.append(edge_trace)
+            for color, bucket in buckets.items() if bucket['weights']
+        ]
         
         # Create node trace
         node_x = []
@@ -290,6 +409,7 @@ with tab2:
             showlegend=False,
             hovermode='closest',
             margin=dict(b=0,l=0,r=0,t=0),
+            uirevision='network',
             xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
             yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
             height=600
@@ -299,7 +419,20 @@ with tab2:
     else:
         st.info("No relationships formed yet. Run some rounds to see the network!")
 
-with tab3:
+# Auto-run refreshes the whole dashboard, not just the match feed, every this many ticks
+AUTO_RUN_FULL_REFRESH_TICKS = 5
+
+@st.fragment(run_every="1s" if st.session_state.auto_run else None)
+def render_match_feed():
+    """Most recent matches, newest first"""
+    # Auto-run ticks only this fragment instead of rerunning the whole script, except
+    # every few ticks when the full rerun keeps the sidebar and other tabs live
+    if st.session_state.auto_run:
+        st.session_state.auto_run_ticks = st.session_state.get('auto_run_ticks', 0) + 1
+        if st.session_state.auto_run_ticks % AUTO_RUN_FULL_REFRESH_TICKS == 0:
+            st.rerun(scope="app")  # The full rerun plays this tick's round
+        run_matchmaking_round()
+    
     st.header("Live Match Feed")
     
     if st.session_state.engine.match_history:
@@ -361,111 +494,100 @@ with tab3:
     else:
         st.info("No games played yet!")
 
-with tab4:
+@st.fragment
+def render_leaderboard(summaries: List[Dict]):
+    """Agents ranked by balance and reputation"""
     st.header("Leaderboard")
     
-    # Create leaderboard data
-    leaderboard_data = []
-    for agent in st.session_state.agents:
-        summary = get_agent_summary(agent)
-        leaderboard_data.append(summary)
-    
-    df = pd.DataFrame(leaderboard_data)
-    
-    # Sort by balance
-    df_sorted = df.sort_values('balance', ascending=False)
+    df_sorted, df_rep = build_leaderboard_df(summaries)
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("💰 By Balance")
-        for idx, row in df_sorted.iterrows():
-            with st.container(border=True):
-                cols = st.columns([3, 2, 2])
-                with cols[0]:
-                    st.markdown(f"**{row['name']}** ({row['attachment']})")
-                with cols[1]:
-                    st.metric("Balance", f"{row['balance']:.2f} MON")
-                with cols[2]:
-                    st.metric("Profit", f"{row['total_profit']:+.2f} MON")
+        st.dataframe(
+            df_sorted[['name', 'attachment', 'balance', 'total_profit']],
+            column_config={
+                'name': "Agent",
+                'attachment': "Style",
+                'balance': st.column_config.NumberColumn("Balance", format="%.2f MON"),
+                'total_profit': st.column_config.NumberColumn("Profit", format="%+.2f MON")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
     
     with col2:
         st.subheader("⭐ By Reputation")
-        df_rep = df.sort_values('reputation', ascending=False)
-        for idx, row in df_rep.iterrows():
-            with st.container(border=True):
-                cols = st.columns([3, 2, 2])
-                with cols[0]:
-                    st.markdown(f"**{row['name']}** ({row['attachment']})")
-                with cols[1]:
-                    st.metric("Reputation", f"{row['reputation']:.1f}")
-                with cols[2]:
-                    st.metric("Games", row['total_games'])
+        st.dataframe(
+            df_rep[['name', 'attachment', 'reputation', 'total_games']],
+            column_config={
+                'name': "Agent",
+                'attachment': "Style",
+                'reputation': st.column_config.ProgressColumn("Reputation", format="%.1f", min_value=0, max_value=100),
+                'total_games': st.column_config.NumberColumn("Games")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
 
-with tab5:
+@st.fragment
+def render_analytics():
+    """System-wide cooperation, trust and ethics charts"""
     st.header("📈 System Analytics")
     
     if st.session_state.engine.match_history:
-        history_df = pd.DataFrame(st.session_state.engine.match_history)
+        # Reuse the figures from the last render until a new round is played
+        analytics_key = (st.session_state.sim_id, st.session_state.round_count)
+        cached_key, figs = st.session_state.get('_analytics_figs', (None, None))
+        if cached_key != analytics_key:
+            history_df, trust_df, ethics_df = build_analytics(
+                st.session_state.sim_id,
+                st.session_state.round_count,
+                st.session_state.engine,
+                st.session_state.agents
+            )
+            figs = {
+                'coop': build_coop_fig(*analytics_key, history_df),
+                'trust': build_trust_fig(*analytics_key, trust_df) if not trust_df.empty else None,
+                'ethics': build_ethics_fig(*analytics_key, ethics_df) if not trust_df.empty else None
+            }
+            st.session_state._analytics_figs = (analytics_key, figs)
         
         # 1. Cooperation Rate over time
         st.subheader("🤝 Global Cooperation Rate")
-        history_df['combined_coop'] = history_df.apply(
-            lambda x: (1 if x['agent1_move'] == 'cooperate' else 0) + (1 if x['agent2_move'] == 'cooperate' else 0), axis=1
-        ) / 2
-        
-        # Calculate rolling cooperation rate
-        window = max(1, len(history_df) // 5)
-        history_df['rolling_coop'] = history_df['combined_coop'].rolling(window=window).mean()
-        
-        fig_coop = px.line(history_df, y='rolling_coop', title=f"Global Cooperation Trend (Rolling Window: {window})")
-        fig_coop.update_layout(yaxis_range=[0, 1])
-        st.plotly_chart(fig_coop, use_container_width=True)
+        st.plotly_chart(figs['coop'], use_container_width=True)
         
         # 2. Trust Distribution by Attachment Style
         st.subheader("🛡️ Trust by Attachment Style")
-        trust_data = []
-        for agent in st.session_state.agents:
-            for partner_name, memory in agent.relationships.items():
-                if memory.total_games > 0:
-                    trust_data.append({
-                        'Agent': agent.profile.name,
-                        'Style': agent.profile.attachment_style.value,
-                        'Trust': memory.trust_score
-                    })
-        
-        if trust_data:
-            trust_df = pd.DataFrame(trust_data)
-            fig_trust = px.box(trust_df, x='Style', y='Trust', color='Style', 
-                              points="all", title="Trust Score Distribution by Attachment Style")
-            st.plotly_chart(fig_trust, use_container_width=True)
+        if figs['trust'] is not None:
+            st.plotly_chart(figs['trust'], use_container_width=True)
             
             # 3. Learning Visibility: Ethics Evolving
             st.subheader("🧠 Adaptive Learning: Ethics Evolution")
-            ethics_data = []
-            for agent in st.session_state.agents:
-                ethics_data.append({
-                    'Agent': agent.profile.name,
-                    'Style': agent.profile.attachment_style.value,
-                    'Fairness': agent.profile.ethics_fairness
-                })
-            ethics_df = pd.DataFrame(ethics_data)
-            fig_ethics = px.bar(ethics_df, x='Agent', y='Fairness', color='Style', 
-                               title="Current Ethics (Fairness) Level (Learned from experience)")
-            st.plotly_chart(fig_ethics, use_container_width=True)
+            st.plotly_chart(figs['ethics'], use_container_width=True)
         else:
             st.info("Play more games to see trust distribution analysis.")
     else:
         st.info("No data yet. Run some rounds to see analytics!")
 
-# Auto-run logic
-if st.session_state.auto_run:
-    # Run a round automatically
-    matches = st.session_state.engine.create_matches()
-    for agent1, agent2 in matches:
-        result = st.session_state.engine.run_round(agent1, agent2)
-        if result:
-            st.session_state.round_count += 1
-    
-    time.sleep(1)
-    st.rerun()
+# Summarize every agent once per rerun; shared by the profile, network and leaderboard tabs
+summaries = [get_agent_summary(agent) for agent in st.session_state.agents]
+
+# Main dashboard
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["👥 Agent Profiles", "🕸️ Relationship Network", "📊 Match Feed", "🏆 Leaderboard", "📈 Analytics"])
+
+with tab1:
+    render_agent_profiles(summaries)
+
+with tab2:
+    render_relationship_network(summaries)
+
+with tab3:
+    render_match_feed()
+
+with tab4:
+    render_leaderboard(summaries)
+
+with tab5:
+    render_analytics()
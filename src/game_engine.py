@@ -1,13 +1,156 @@
 """
 Game engine that orchestrates iterated Prisoner's Dilemma games between agents
 """
+import asyncio
+import logging
+import logging.handlers
 import random
-from typing import List, Dict, Tuple, Optional, Any, TYPE_CHECKING
+import sys
+from collections import deque
+from collections.abc import Sequence
+import numpy as np
+from typing import List, Dict, Iterable, Tuple, Optional, Any, TYPE_CHECKING
 from agent import Agent, Goal, AttachmentStyle
+from kernels import resolve_matches
 
 if TYPE_CHECKING:
+    import pandas as pd
     from blockchain import BlockchainIntegration
 
+logger = logging.getLogger(__name__)
+
+def configure_logging() -> None:
+    """Print engine progress to stdout, buffered and written once per round
+    
+    Opt-in for entry points (demos, dashboard); warnings are written immediately.
+    Safe to call more than once.
+    """
+    if any(isinstance(h, logging.handlers.MemoryHandler) for h in logger.handlers):
+        return
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(logging.handlers.MemoryHandler(capacity=1024, flushLevel=logging.WARNING,
+                                                     target=stdout_handler))
+    logger.setLevel(logging.INFO)
+
+def _flush_log() -> None:
+    """Write out any progress buffered during the round"""
+    for handler in logger.handlers:
+        handler.flush()
+
+# One match per row of a preallocated struct array (moves: True = cooperate). Names and
+# decision reasons repeat endlessly, so rows store codes into an interned string table.
+HISTORY_DTYPE = np.dtype([
+    ('agent1_name', 'u4'), ('agent2_name', 'u4'),
+    ('agent1_reason', 'u4'), ('agent2_reason', 'u4'),
+    ('agent1_move', '?'), ('agent2_move', '?'),
+    ('agent1_stake', 'f8'), ('agent2_stake', 'f8'),
+    ('agent1_payout', 'f8'), ('agent2_payout', 'f8'),
+    ('bond_rounds', 'u4'),
+])
+HISTORY_COLUMNS = (
+    'agent1_name', 'agent2_name', 'agent1_move', 'agent2_move',
+    'agent1_reason', 'agent2_reason', 'agent1_stake', 'agent2_stake',
+    'agent1_payout', 'agent2_payout', 'agent1_profit', 'agent2_profit',
+    'bond_rounds'
+)
+_STRING_COLUMNS = ('agent1_name', 'agent2_name', 'agent1_reason', 'agent2_reason')
+_INITIAL_HISTORY_CAPACITY = 256
+
+class MatchHistory(Sequence):
+    """Append-only match history stored column-wise
+    
+    Reads like a list of per-match dicts (the same keys run_round returns); each
+    dict is built on access. On-chain tx details are kept only for the rows that
+    have them.
+    """
+    
+    def __init__(self):
+        self._rows = np.empty(_INITIAL_HISTORY_CAPACITY, dtype=HISTORY_DTYPE)
+        self._len = 0
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._tx_details: Dict[int, Dict[str, Any]] = {}
+    
+    def _code(self, text: str) -> int:
+        code = self._string_codes.get(text)
+        if code is None:
+            code = self._string_codes[text] = len(self._strings)
+            self._strings.append(text)
+        return code
+    
+    def append(self, n1: str, n2: str, reason1: str, reason2: str, move1: bool, move2: bool,
+               stake1: float, stake2: float, payout1: float, payout2: float, bond_rounds: int,
+               tx_details: Optional[Dict[str, Any]] = None):
+        """Record one match, doubling the array's capacity when full"""
+        if self._len == len(self._rows):
+            grown = np.empty(2 * len(self._rows), dtype=HISTORY_DTYPE)
+            grown[:self._len] = self._rows
+            self._rows = grown
+        self._rows[self._len] = (
+            self._code(n1), self._code(n2), self._code(reason1), self._code(reason2),
+            move1, move2, stake1, stake2, payout1, payout2, bond_rounds
+        )
+        if tx_details:
+            self._tx_details[self._len] = tx_details
+        self._len += 1
+    
+    @property
+    def array(self) -> np.ndarray:
+        """The rows as a struct array with string codes (a view, valid until the next append)"""
+        return self._rows[:self._len]
+    
+    def strings(self, codes: np.ndarray) -> np.ndarray:
+        """Decode string codes from the array into an object array of str"""
+        return np.array(self._strings, dtype=object)[codes] if self._strings else np.empty(0, dtype=object)
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("match history index out of range")
+        return self._row(index)
+    
+    def _row(self, i: int) -> Dict:
+        row = self._rows[i]
+        strings = self._strings
+        stake1, stake2 = float(row['agent1_stake']), float(row['agent2_stake'])
+        payout1, payout2 = float(row['agent1_payout']), float(row['agent2_payout'])
+        return {
+            'agent1_name': strings[row['agent1_name']],
+            'agent2_name': strings[row['agent2_name']],
+            'agent1_move': 'cooperate' if row['agent1_move'] else 'defect',
+            'agent2_move': 'cooperate' if row['agent2_move'] else 'defect',
+            'agent1_reason': strings[row['agent1_reason']],
+            'agent2_reason': strings[row['agent2_reason']],
+            'agent1_stake': stake1,
+            'agent2_stake': stake2,
+            'agent1_payout': payout1,
+            'agent2_payout': payout2,
+            'agent1_profit': payout1 - stake1,
+            'agent2_profit': payout2 - stake2,
+            'bond_rounds': int(row['bond_rounds']),
+            **self._tx_details.get(i, {})
+        }
+
+# Prisoner's Dilemma payout multipliers indexed by (move1 << 1) | move2 (False = defect)
+_PAYOFF_MULTIPLIERS: Tuple[Tuple[float, float], ...] = (
+    (0.5, 0.5),  # Both defect (1, 1)
+    (2.5, 0.0),  # Agent1 exploits (5, 0)
+    (0.0, 2.5),  # Agent1 exploited (0, 5)
+    (1.5, 1.5),  # Both cooperate (3, 3)
+)
+_PAYOFF_MULTIPLIERS_ARRAY = np.array(_PAYOFF_MULTIPLIERS)
+
+# Smallest round whose payoffs are worth computing as arrays (measured without Numba;
+# below a couple of thousand games the conversions outweigh the arithmetic)
+_MIN_VECTORIZED_MATCHES = 2048
+
 class GameEngine:
     """Orchestrates autonomous agent interactions"""
     
@@ -15,40 +158,71 @@ class GameEngine:
         self.agents = agents
         self.blockchain = blockchain
         self.active_bonds: Dict[Tuple[str, str], int] = {}  # (agent1, agent2) -> rounds_played
-        self.match_history: List[Dict] = []
+        self._bond_cap: Dict[Tuple[str, str], int] = {}  # (agent1, agent2) -> rounds before natural end
+        self.match_history = MatchHistory()
+        self._history_df: Optional['pd.DataFrame'] = None
+        self._reindex()
+    
+    def _reindex(self):
+        """Rebuild the name -> agent index and per-agent arrays (call after adding or removing agents)"""
+        self._agents_by_name: Dict[str, Agent] = {a.profile.name: a for a in self.agents}
+        for i, agent in enumerate(self.agents):
+            agent._idx = i
+        
+        # Struct-of-arrays mirror of agent state; trust_matrix[i, j] is i's trust in j (NaN = never met)
+        n = len(self.agents)
+        self.names = np.array([a.profile.name for a in self.agents], dtype=str)
+        self.balances = np.zeros(n)
+        self.reputations = np.zeros(n)
+        self.trust_matrix = np.full((n, n), np.nan)
+        self.refresh_agent_state()
+    
+    def refresh_agent_state(self, agents: Optional[Iterable[Agent]] = None):
+        """Copy balance, reputation and trust of the given agents (default: all) into the arrays
+        
+        Call this after changing agent state outside the engine (e.g. syncing on-chain balances).
+        """
+        index = self._agents_by_name
+        for agent in self.agents if agents is None else agents:
+            i = agent._idx
+            self.balances[i] = agent.balance
+            self.reputations[i] = agent.profile.reputation_score
+            row = self.trust_matrix[i]
+            for partner_name, memory in agent.relationships.items():
+                partner = index.get(partner_name)
+                if partner is not None:
+                    row[partner._idx] = memory.trust_score
         
     def create_matches(self) -> List[Tuple[Agent, Agent]]:
         """Autonomously pair agents based on compatibility"""
         matches = []
-        available = self.agents.copy()
-        random.shuffle(available)
+        order = list(self.agents)
+        random.shuffle(order)
         
-        # First, let agents choose partners
-        used = set()
-        for agent in available:
-            if agent.profile.name in used:
+        # First, let agents choose partners. An insertion-ordered dict serves as the
+        # available set, so removal is O(1) and candidate order stays the shuffled order.
+        available = dict.fromkeys(order)
+        for agent in list(available):
+            if agent not in available:
                 continue
             
-            potential_partners = [a for a in available if a.profile.name not in used 
-                                 and a.profile.name != agent.profile.name]
+            potential_partners = [a for a in available if a is not agent]
             partner = agent.select_partner(potential_partners)
             
             if partner:
                 matches.append((agent, partner))
-                used.add(agent.profile.name)
-                used.add(partner.profile.name)
+                del available[agent]
+                del available[partner]
         
         # Random pairing for remaining agents
-        remaining = [a for a in available if a.profile.name not in used]
+        remaining = deque(available)
         while len(remaining) >= 2:
-            agent1 = remaining.pop(0)
-            agent2 = remaining.pop(0)
-            matches.append((agent1, agent2))
+            matches.append((remaining.popleft(), remaining.popleft()))
         
         return matches
     
-    def run_round(self, agent1: Agent, agent2: Agent) -> Optional[Dict]:
-        """Run a single game round between two agents"""
+    def _decide_stakes(self, agent1: Agent, agent2: Agent) -> Tuple[float, float]:
+        """Agents decide stakes, capped by what they can afford"""
         # Agents decide stakes
         stake1 = float(agent1.calculate_stake(agent2))
         stake2 = float(agent2.calculate_stake(agent1))
@@ -70,162 +244,419 @@ class GameEngine:
             stake1 = float(min(stake1, float(agent1.balance)))
             stake2 = float(min(stake2, float(agent2.balance)))
         
+        return stake1, stake2
+    
+    def _decide_round(self, agent1: Agent, agent2: Agent) -> Optional[Tuple[float, float, bool, bool]]:
+        """Stakes and moves for one game, or None if either agent can't play"""
+        stake1, stake2 = self._decide_stakes(agent1, agent2)
+        
         if stake1 <= 0 or stake2 <= 0:
             return None  # Can't play
         
         # Agents make independent decisions
         move1 = agent1.decide_move(agent2, stake1)
         move2 = agent2.decide_move(agent1, stake2)
-        
-        tx_details: Dict[str, Any] = {}
+        return stake1, stake2, move1, move2
+    
+    def run_round(self, agent1: Agent, agent2: Agent) -> Optional[Dict]:
+        """Run a single game round between two agents"""
+        decided = self._decide_round(agent1, agent2)
+        if decided is None:
+            return None  # Can't play
+        stake1, stake2, move1, move2 = decided
         
         # On-chain execution if blockchain mode is active
         if self.blockchain and self.blockchain.contract:
-            try:
-                # 1. Create Game (Agent 1)
-                print(f"⛓️ Broadcasting create_game (Agent 1: {agent1.profile.name})...")
-                stake_wei = self.blockchain.w3.to_wei(stake1, 'ether')
-                game_id, tx_create = self.blockchain.create_game(agent1.profile.private_key, agent2.profile.address, stake_wei)
-                
-                # Record the hash immediately so it's visible even on failure
-                tx_details['tx_hashes'] = {'create': tx_create}
-                
-                # CRITICAL: Validate Game ID before proceeding
-                if game_id is None:
-                    raise Exception("Game creation failed on-chain (Transaction might have reverted or no Game ID in logs)")
-                
-                print(f"✅ Game Created: ID #{game_id}")
-                tx_details['game_id'] = game_id
-                
-                # 2. Join Game (Agent 2)
-                print(f"⛓️ Broadcasting join_game (Agent 2: {agent2.profile.name})...")
-                stake2_wei = self.blockchain.w3.to_wei(stake2, 'ether')
-                tx_join = self.blockchain.join_game(game_id, agent2.profile.private_key, stake2_wei)
-                tx_details['tx_hashes']['join'] = tx_join
-                print("✅ Join Confirmed")
-                
-                # 3. Commit Moves (Both)
-                print(f"⛓️ Broadcasting commit_move (Agent 1: {agent1.profile.name})...")
-                tx_commit1, salt1 = self.blockchain.commit_move(game_id, agent1.profile.private_key, move1)
-                print(f"⛓️ Broadcasting commit_move (Agent 2: {agent2.profile.name})...")
-                tx_commit2, salt2 = self.blockchain.commit_move(game_id, agent2.profile.private_key, move2)
-                tx_details['tx_hashes']['commit1'] = tx_commit1
-                tx_details['tx_hashes']['commit2'] = tx_commit2
-                print("✅ Commits Confirmed")
-                
-                # 4. Reveal Moves (Both)
-                print(f"⛓️ Broadcasting reveal_move (Agent 1: {agent1.profile.name})...")
-                tx_reveal1 = self.blockchain.reveal_move(game_id, agent1.profile.private_key, move1, salt1)
-                print(f"⛓️ Broadcasting reveal_move (Agent 2: {agent2.profile.name})...")
-                tx_reveal2 = self.blockchain.reveal_move(game_id, agent2.profile.private_key, move2, salt2)
-                tx_details['tx_hashes']['reveal1'] = tx_reveal1
-                tx_details['tx_hashes']['reveal2'] = tx_reveal2
-                print("✅ Reveals Confirmed")
-                
-                # 5. Get Final Results from Contract
-                game_result = self.blockchain.get_game(game_id)
-                tx_details['on_chain'] = True
-                
-                # Payouts
-                payout1, payout2 = self._calculate_payoffs(move1, move2, stake1, stake2)
-                
-            except Exception as e:
-                print(f"Blockchain transaction failed: {e}")
-                tx_details['error'] = str(e)
-                # Fallback or record failure
-                # If game_id was None, we didn't actually start an on-chain game
-                payout1, payout2 = 0, 0 # No payout if it failed to start
-                if 'game_id' not in tx_details:
-                    # Off-chain fallback if user wants to keep sim moving, 
-                    # but for this request we want robustness, so we record the failure
-                    pass
+            payout1, payout2, tx_details = asyncio.run(
+                self._play_onchain(agent1, agent2, move1, move2, stake1, stake2)
+            )
+            _flush_log()
         else:
             # Calculate payoffs based on Prisoner's Dilemma
             payout1, payout2 = self._calculate_payoffs(move1, move2, stake1, stake2)
+            tx_details = {}
+        
+        return self._record_match(agent1, agent2, move1, move2, stake1, stake2, payout1, payout2, tx_details)
+    
+    async def run_round_concurrent(self, matches: List[Tuple[Agent, Agent]]) -> List[Optional[Dict]]:
+        """Run every match of a round at once, returning results in match order (None = couldn't play)
+        
+        Pairs must be disjoint (as returned by create_matches). In blockchain mode the
+        on-chain games run concurrently, sharing one lock per account address; results
+        are recorded in match order once all have finished. Off-chain games are CPU-bound
+        and simply run one after another.
+        """
+        if not (self.blockchain and self.blockchain.contract):
+            return [self.run_round(agent1, agent2) for agent1, agent2 in matches]
+        
+        decided = [(agent1, agent2, self._decide_round(agent1, agent2)) for agent1, agent2 in matches]
+        playable = [(agent1, agent2, d) for agent1, agent2, d in decided if d is not None]
+        
+        locks: Dict[str, asyncio.Lock] = {}
+        outcomes = await asyncio.gather(*(
+            self._play_onchain(agent1, agent2, move1, move2, stake1, stake2, locks)
+            for agent1, agent2, (stake1, stake2, move1, move2) in playable
+        ))
+        _flush_log()
+        
+        recorded = iter(
+            self._record_match(agent1, agent2, move1, move2, stake1, stake2, payout1, payout2, tx_details)
+            for (agent1, agent2, (stake1, stake2, move1, move2)), (payout1, payout2, tx_details)
+            in zip(playable, outcomes)
+        )
+        return [next(recorded) if d is not None else None for _, _, d in decided]
+    
+    async def _play_onchain(self, agent1: Agent, agent2: Agent, move1: bool, move2: bool,
+                            stake1: float, stake2: float,
+                            locks: Optional[Dict[str, asyncio.Lock]] = None) -> Tuple[float, float, Dict[str, Any]]:
+        """Play one game on-chain, returning (payout1, payout2, tx_details); failures pay nothing"""
+        tx_details: Dict[str, Any] = {}
+        try:
+            await self._run_round_onchain(agent1, agent2, move1, move2, stake1, stake2, tx_details, locks)
+            
+            # Payouts
+            payout1, payout2 = self._calculate_payoffs(move1, move2, stake1, stake2)
+            
+        except Exception as e:
+            logger.warning("Blockchain transaction failed: %s", e)
+            tx_details['error'] = str(e)
+            # Fallback or record failure
+            # If game_id was None, we didn't actually start an on-chain game
+            payout1, payout2 = 0, 0 # No payout if it failed to start
         
+        return payout1, payout2, tx_details
+    
+    async def _run_round_onchain(self, agent1: Agent, agent2: Agent, move1: bool, move2: bool,
+                                 stake1: float, stake2: float, tx_details: Dict[str, Any],
+                                 locks: Optional[Dict[str, asyncio.Lock]] = None) -> None:
+        """Play one game on-chain, overlapping the transactions that don't depend on each other
+        
+        create and join must land in order, but the two commits (and then the two reveals)
+        come from different accounts and are sent concurrently. The sync web3 calls run in
+        worker threads; a lock per account keeps one in-flight transaction per nonce.
+        Hashes are written to tx_details as they confirm so they survive a later failure.
+        Pass a shared locks dict when several games run at once.
+        """
+        bc = self.blockchain
+        if locks is None:
+            locks = {}
+        
+        async def send(agent: Agent, fn, *args):
+            lock = locks.setdefault(agent.profile.address, asyncio.Lock())
+            async with lock:
+                return await asyncio.to_thread(fn, *args)
+        
+        # 1. Create Game (Agent 1)
+        logger.debug("⛓️ Broadcasting create_game (Agent 1: %s)...", agent1.profile.name)
+        stake_wei = bc.w3.to_wei(stake1, 'ether')
+        game_id, tx_create = await send(agent1, bc.create_game, agent1.profile.private_key, agent2.profile.address, stake_wei)
+        
+        # Record the hash immediately so it's visible even on failure
+        tx_details['tx_hashes'] = {'create': tx_create}
+        
+        # CRITICAL: Validate Game ID before proceeding
+        if game_id is None:
+            raise Exception("Game creation failed on-chain (Transaction might have reverted or no Game ID in logs)")
+        
+        logger.info("✅ Game Created: ID #%s", game_id)
+        tx_details['game_id'] = game_id
+        
+        # 2. Join Game (Agent 2)
+        logger.debug("⛓️ Broadcasting join_game (Agent 2: %s)...", agent2.profile.name)
+        stake2_wei = bc.w3.to_wei(stake2, 'ether')
+        tx_details['tx_hashes']['join'] = await send(agent2, bc.join_game, game_id, agent2.profile.private_key, stake2_wei)
+        logger.debug("✅ Join Confirmed")
+        
+        # 3. Commit Moves (Both at once)
+        logger.debug("⛓️ Broadcasting commit_move (%s & %s)...", agent1.profile.name, agent2.profile.name)
+        (tx_commit1, salt1), (tx_commit2, salt2) = await asyncio.gather(
+            send(agent1, bc.commit_move, game_id, agent1.profile.private_key, move1),
+            send(agent2, bc.commit_move, game_id, agent2.profile.private_key, move2),
+        )
+        tx_details['tx_hashes']['commit1'] = tx_commit1
+        tx_details['tx_hashes']['commit2'] = tx_commit2
+        logger.debug("✅ Commits Confirmed")
+        
+        # 4. Reveal Moves (Both at once)
+        logger.debug("⛓️ Broadcasting reveal_move (%s & %s)...", agent1.profile.name, agent2.profile.name)
+        tx_reveal1, tx_reveal2 = await asyncio.gather(
+            send(agent1, bc.reveal_move, game_id, agent1.profile.private_key, move1, salt1),
+            send(agent2, bc.reveal_move, game_id, agent2.profile.private_key, move2, salt2),
+        )
+        tx_details['tx_hashes']['reveal1'] = tx_reveal1
+        tx_details['tx_hashes']['reveal2'] = tx_reveal2
+        logger.debug("✅ Reveals Confirmed")
+        
+        # 5. Get Final Results from Contract (only settled once both reveals have landed)
+        await asyncio.to_thread(bc.get_game, game_id)
+        tx_details['on_chain'] = True
+    
+    def run_rounds_batch(self, pairs: List[Tuple[Agent, Agent]]) -> List[Dict]:
+        """Run one game for each pair, deciding every game before any is recorded
+        
+        Pairs must be disjoint (as returned by create_matches), since every stake and
+        move is decided before any agent is updated; results then match calling
+        run_round on each pair in turn with the same seed. In blockchain mode every
+        stage of every game is broadcast together (see _run_rounds_onchain). Payoffs
+        are computed in one vectorized pass only for rounds of at least
+        _MIN_VECTORIZED_MATCHES games; below that, converting to and from arrays
+        costs more than the per-game arithmetic it replaces.
+        """
+        if self.blockchain and self.blockchain.contract:
+            return self._run_rounds_onchain(pairs)
+        
+        # Agents decide stakes (capped by their balance) and moves, game by game
+        playable = []
+        for agent1, agent2 in pairs:
+            decided = self._decide_round(agent1, agent2)
+            if decided is not None:
+                playable.append((agent1, agent2, *decided))
+        
+        if len(playable) >= _MIN_VECTORIZED_MATCHES:
+            # Payoffs for every match at once
+            _, _, stakes1, stakes2, moves1, moves2 = zip(*playable)
+            payouts1, payouts2 = self._calculate_payoffs_vec(
+                np.array(moves1), np.array(moves2), np.array(stakes1), np.array(stakes2)
+            )
+            payouts = zip(payouts1.tolist(), payouts2.tolist())
+        else:
+            payouts = (self._calculate_payoffs(move1, move2, stake1, stake2)
+                       for _, _, stake1, stake2, move1, move2 in playable)
+        
+        return [
+            self._record_match(agent1, agent2, move1, move2, stake1, stake2, payout1, payout2, {})
+            for (agent1, agent2, stake1, stake2, move1, move2), (payout1, payout2) in zip(playable, payouts)
+        ]
+    
+    def _run_rounds_onchain(self, pairs: List[Tuple[Agent, Agent]]) -> List[Dict]:
+        """Play one on-chain game per pair, sending each stage for all games as one batch
+        
+        create, join, commit and reveal each go out as a single JSON-RPC batch and their
+        receipts are polled together, so a round costs a handful of HTTP round-trips
+        rather than seven per game. A game that fails at any stage is recorded with its
+        error and no payout, and is left out of the later stages.
+        """
+        bc = self.blockchain
+        games = []
+        for agent1, agent2 in pairs:
+            stake1, stake2 = self._decide_stakes(agent1, agent2)
+            if stake1 <= 0 or stake2 <= 0:
+                continue  # Can't play
+            games.append({
+                'agents': (agent1, agent2),
+                'stakes': (stake1, stake2),
+                'moves': (agent1.decide_move(agent2, stake1), agent2.decide_move(agent1, stake2)),
+                'tx': {'tx_hashes': {}},
+            })
+        
+        def stage(name: str, build) -> None:
+            """Broadcast one stage for every live game; build returns [(tx_key, transaction, private_key)]"""
+            live = [g for g in games if 'error' not in g['tx']]
+            if not live:
+                return
+            logger.debug("⛓️ Broadcasting %s for %d games...", name, len(live))
+            sends = []
+            for game in live:
+                try:
+                    sends.extend((game, key, tx, pk) for key, tx, pk in build(game))
+                except Exception as e:
+                    game['tx']['error'] = str(e)
+            sends = [s for s in sends if 'error' not in s[0]['tx']]
+            if not sends:
+                return
+            try:
+                results = bc.transact_batched([(tx, pk) for _, _, tx, pk in sends])
+            except Exception as e:
+                # Signing failed or receipts timed out; the stage's games end here but are still recorded
+                for game, _, _, _ in sends:
+                    game['tx'].setdefault('error', str(e))
+                return
+            for (game, key, _, _), (tx_hash, receipt, error) in zip(sends, results):
+                if tx_hash:
+                    game['tx']['tx_hashes'][key] = tx_hash
+                if error:
+                    game['tx'].setdefault('error', error)
+                elif key == 'create':
+                    game['receipt'] = receipt
+            logger.info("✅ %s confirmed for %d games", name, sum('error' not in g['tx'] for g in live))
+        
+        def to_wei(stake: float) -> int:
+            return bc.w3.to_wei(stake, 'ether')
+        
+        # Fees and nonces are fetched once and reused by every transaction this round
+        try:
+            round_ctx = bc.begin_round([a.profile.address for g in games for a in g['agents']]) if games else None
+        except Exception as e:
+            for game in games:
+                game['tx']['error'] = str(e)
+        
+        # 1. Create Games (Agent 1)
+        stage('create_game', lambda g: [(
+            'create', bc.build_create_game(g['agents'][0].profile.private_key, g['agents'][1].profile.address, to_wei(g['stakes'][0]), round_ctx),
+            g['agents'][0].profile.private_key)])
+        for game in games:
+            if 'error' not in game['tx']:
+                try:
+                    game['tx']['game_id'] = bc.game_id_from_receipt(game.pop('receipt'))
+                except Exception as e:
+                    game['tx']['error'] = str(e)
+                    continue
+                if game['tx']['game_id'] is None:
+                    game['tx']['error'] = "Game creation failed on-chain (no Game ID in logs)"
+        
+        # 2. Join Games (Agent 2)
+        stage('join_game', lambda g: [(
+            'join', bc.build_join_game(g['tx']['game_id'], g['agents'][1].profile.private_key, to_wei(g['stakes'][1]), round_ctx),
+            g['agents'][1].profile.private_key)])
+        
+        # 3. Commit Moves (Both)
+        def build_commits(game):
+            sends = []
+            game['salts'] = []
+            for i, (agent, move) in enumerate(zip(game['agents'], game['moves']), 1):
+                transaction, salt = bc.build_commit_move(game['tx']['game_id'], agent.profile.private_key, move, round_ctx)
+                game['salts'].append(salt)
+                sends.append((f'commit{i}', transaction, agent.profile.private_key))
+            return sends
+        stage('commit_move', build_commits)
+        
+        # 4. Reveal Moves (Both)
+        stage('reveal_move', lambda g: [
+            (f'reveal{i}', bc.build_reveal_move(g['tx']['game_id'], agent.profile.private_key, move, salt, round_ctx), agent.profile.private_key)
+            for i, (agent, move, salt) in enumerate(zip(g['agents'], g['moves'], g['salts']), 1)
+        ])
+        
+        # 5. Get Final Results from Contract
+        settled = [g for g in games if 'error' not in g['tx']]
+        if settled:
+            try:
+                bc.get_games([g['tx']['game_id'] for g in settled])
+                for game in settled:
+                    game['tx']['on_chain'] = True
+            except Exception as e:
+                for game in settled:
+                    game['tx']['error'] = str(e)
+        
+        results = []
+        for game in games:
+            (agent1, agent2), (stake1, stake2), (move1, move2) = game['agents'], game['stakes'], game['moves']
+            if 'error' in game['tx']:
+                logger.warning("Blockchain transaction failed: %s", game['tx']['error'])
+                payout1, payout2 = 0, 0  # No payout if the game didn't complete
+            else:
+                payout1, payout2 = self._calculate_payoffs(move1, move2, stake1, stake2)
+            results.append(self._record_match(agent1, agent2, move1, move2, stake1, stake2, payout1, payout2, game['tx']))
+        _flush_log()
+        return results
+    
+    def _record_match(self, agent1: Agent, agent2: Agent, move1: bool, move2: bool,
+                      stake1: float, stake2: float, payout1: float, payout2: float,
+                      tx_details: Dict[str, Any]) -> Dict:
+        """Apply a finished game to both agents and append it to the match history"""
         # Update agents
         agent1.update_after_game(agent2, move1, move2, stake1, payout1)
         agent2.update_after_game(agent1, move2, move1, stake2, payout2)
         
+        # Mirror just what the game changed into the arrays
+        n1, n2 = agent1.profile.name, agent2.profile.name
+        i, j = agent1._idx, agent2._idx
+        self.balances[i] = agent1.balance
+        self.balances[j] = agent2.balance
+        self.reputations[i] = agent1.profile.reputation_score
+        self.reputations[j] = agent2.profile.reputation_score
+        self.trust_matrix[i, j] = agent1.relationships[n2].trust_score
+        self.trust_matrix[j, i] = agent2.relationships[n1].trust_score
+        
         # Record match
-        bond_key = tuple(sorted([agent1.profile.name, agent2.profile.name]))
-        self.active_bonds[bond_key] = self.active_bonds.get(bond_key, 0) + 1
-        
-        result = {
-            'agent1_name': agent1.profile.name,
-            'agent2_name': agent2.profile.name,
-            'agent1_move': 'cooperate' if move1 else 'defect',
-            'agent2_move': 'cooperate' if move2 else 'defect',
-            'agent1_reason': agent1.last_decision_reason,
-            'agent2_reason': agent2.last_decision_reason,
-            'agent1_stake': stake1,
-            'agent2_stake': stake2,
-            'agent1_payout': payout1,
-            'agent2_payout': payout2,
-            'agent1_profit': payout1 - stake1,
-            'agent2_profit': payout2 - stake2,
-            'bond_rounds': self.active_bonds[bond_key],
-            **tx_details
-        }
+        bond_key = (n1, n2) if n1 < n2 else (n2, n1)
+        bond_rounds = self.active_bonds.get(bond_key, 0) + 1
+        self.active_bonds[bond_key] = bond_rounds
         
-        self.match_history.append(result)
-        return result
+        self.match_history.append(
+            n1, n2, agent1.last_decision_reason, agent2.last_decision_reason,
+            move1, move2, stake1, stake2, payout1, payout2, bond_rounds, tx_details
+        )
+        return self.match_history[-1]
+    
+    @property
+    def match_history_df(self) -> 'pd.DataFrame':
+        """Match history as a DataFrame, built from the struct array and reused until the next game"""
+        import pandas as pd  # Only analytics needs pandas; the console demos run without it
+        
+        history = self.match_history
+        if self._history_df is None or len(self._history_df) != len(history):
+            rows = history.array
+            move_dtype = pd.CategoricalDtype(['cooperate', 'defect'])
+            columns = {}
+            for column in HISTORY_COLUMNS:
+                if column in _STRING_COLUMNS:
+                    columns[column] = history.strings(rows[column])
+                elif column in ('agent1_move', 'agent2_move'):
+                    # Category codes: 0 = cooperate, 1 = defect
+                    columns[column] = pd.Categorical.from_codes((~rows[column]).view(np.int8), dtype=move_dtype)
+                elif column == 'agent1_profit':
+                    columns[column] = rows['agent1_payout'] - rows['agent1_stake']
+                elif column == 'agent2_profit':
+                    columns[column] = rows['agent2_payout'] - rows['agent2_stake']
+                else:
+                    columns[column] = rows[column]
+            self._history_df = pd.DataFrame(columns)
+        return self._history_df
     
     def _calculate_payoffs(self, move1: bool, move2: bool, stake1: float, stake2: float) -> Tuple[float, float]:
         """Calculate Prisoner's Dilemma payoffs"""
-        if move1 and move2:
-            # Both cooperate: (3, 3) - each gets 1.5x stake
-            return (stake1 * 1.5, stake2 * 1.5)
-        elif not move1 and not move2:
-            # Both defect: (1, 1) - each gets 0.5x stake
-            return (stake1 * 0.5, stake2 * 0.5)
-        elif not move1 and move2:
-            # Agent1 defects, Agent2 cooperates: (5, 0)
-            return (stake1 * 2.5, 0)
-        else:
-            # Agent1 cooperates, Agent2 defects: (0, 5)
-            return (0, stake2 * 2.5)
+        mult1, mult2 = _PAYOFF_MULTIPLIERS[(move1 << 1) | move2]
+        return (stake1 * mult1, stake2 * mult2)
+    
+    @staticmethod
+    def _calculate_payoffs_vec(moves1: np.ndarray, moves2: np.ndarray,
+                               stakes1: np.ndarray, stakes2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculate Prisoner's Dilemma payoffs for many games at once (1-D arrays)"""
+        payouts1 = np.empty(len(moves1))
+        payouts2 = np.empty(len(moves2))
+        resolve_matches(moves1, moves2, stakes1.astype(np.float64), stakes2.astype(np.float64),
+                        _PAYOFF_MULTIPLIERS_ARRAY, payouts1, payouts2)
+        return payouts1, payouts2
     
     def evaluate_bonds(self) -> List[Tuple[Agent, Agent, bool]]:
         """Evaluate which bonds should continue"""
         evaluations = []
         
-        # Create a list of bond keys to avoid dictionary size change during iteration
-        bond_keys = list(self.active_bonds.keys())
+        agents_by_name = self._agents_by_name
+        trust = self.trust_matrix
+        bond_cap = self._bond_cap
         
-        for (name1, name2) in bond_keys:
-            rounds = self.active_bonds[(name1, name2)]
-            agent1 = next(a for a in self.agents if a.profile.name == name1)
-            agent2 = next(a for a in self.agents if a.profile.name == name2)
+        # Snapshot the bonds to avoid dictionary size change during iteration
+        for bond_key, rounds in list(self.active_bonds.items()):
+            n1, n2 = bond_key
+            agent1 = agents_by_name[n1]
+            agent2 = agents_by_name[n2]
             
-            # Decide if bond continues
-            # Bond breaks if:
-            # 1. Either agent doesn't want rematch
-            # 2. Trust is too low
-            # 3. Played too many rounds (5-10)
-            
-            wants_continue = True
-            
-            if rounds >= random.randint(5, 10):
-                wants_continue = False  # Natural end
+            # Each bond gets a lifetime of 5-10 rounds, drawn once when first evaluated
+            cap = bond_cap.get(bond_key)
+            if cap is None:
+                cap = bond_cap[bond_key] = random.randint(5, 10)
             
-            if not agent1.wants_rematch(agent2) or not agent2.wants_rematch(agent1):
-                wants_continue = False
-            
-            # Check trust levels
-            mem1 = agent1.relationships.get(agent2.profile.name)
-            mem2 = agent2.relationships.get(agent1.profile.name)
-            
-            if mem1 and mem1.trust_score < 20:
-                wants_continue = False
-            if mem2 and mem2.trust_score < 20:
-                wants_continue = False
+            # Decide if bond continues, cheapest checks first
+            # Bond breaks if:
+            # 1. Played too many rounds
+            # 2. Either agent doesn't want rematch
+            # 3. Trust is too low (NaN, never met, compares False)
+            i, j = agent1._idx, agent2._idx
+            wants_continue = not (
+                rounds >= cap
+                or not agent1.wants_rematch(agent2)
+                or not agent2.wants_rematch(agent1)
+                or trust[i, j] < 20
+                or trust[j, i] < 20
+            )
             
             evaluations.append((agent1, agent2, wants_continue))
             
             if not wants_continue:
                 # Break bond
-                del self.active_bonds[(name1, name2)]
+                del self.active_bonds[bond_key]
+                del bond_cap[bond_key]
         
         return evaluations
     
@@ -234,6 +665,6 @@ class GameEngine:
         return {
             'total_games': len(self.match_history),
             'active_bonds': len(self.active_bonds),
-            'agent_balances': {a.profile.name: a.balance for a in self.agents},
-            'agent_reputations': {a.profile.name: a.profile.reputation_score for a in self.agents}
+            'agent_balances': dict(zip(self.names.tolist(), self.balances.tolist())),
+            'agent_reputations': dict(zip(self.names.tolist(), self.reputations.tolist()))
         }
@@ -0,0 +1,175 @@
+"""
+Numeric kernels for resolving games and agent decisions
+
+Numba is optional: when it is installed the kernels are JIT-compiled (the batch
+ones in parallel), otherwise the same functions run as plain NumPy/Python.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def resolve_matches(moves1: np.ndarray, moves2: np.ndarray,
+                        stakes1: np.ndarray, stakes2: np.ndarray, multipliers: np.ndarray,
+                        out_payout1: np.ndarray, out_payout2: np.ndarray) -> None:
+        """Write each game's payouts into out_payout1/out_payout2
+
+        multipliers is a (4, 2) table indexed by (move1 << 1) | move2.
+        """
+        for i in prange(moves1.shape[0]):
+            k = (2 if moves1[i] else 0) + (1 if moves2[i] else 0)
+            out_payout1[i] = stakes1[i] * multipliers[k, 0]
+            out_payout2[i] = stakes2[i] * multipliers[k, 1]
+else:
+    def resolve_matches(moves1: np.ndarray, moves2: np.ndarray,
+                        stakes1: np.ndarray, stakes2: np.ndarray, multipliers: np.ndarray,
+                        out_payout1: np.ndarray, out_payout2: np.ndarray) -> None:
+        """Write each game's payouts into out_payout1/out_payout2
+
+        multipliers is a (4, 2) table indexed by (move1 << 1) | move2.
+        """
+        mults = multipliers[(moves1.astype(np.intp) << 1) | moves2]
+        np.multiply(stakes1, mults[:, 0], out=out_payout1)
+        np.multiply(stakes2, mults[:, 1], out=out_payout2)
+
+
+# Attachment style codes for the scalar agent kernels below
+ATTACH_SECURE, ATTACH_ANXIOUS, ATTACH_AVOIDANT, ATTACH_DISORGANIZED = 0, 1, 2, 3
+
+# Codes for RelationshipMemory.last_interaction_outcome
+OUTCOME_NONE, OUTCOME_COOPERATED, OUTCOME_DEFECTED = 0, 1, 2
+
+# Bits of the reason mask returned by cooperation_prob, in the order the reasons apply
+REASON_BASE = 1 << 0
+REASON_STRONG_TRUST = 1 << 1
+REASON_WARY = 1 << 2
+REASON_FAIRNESS = 1 << 3
+REASON_SECURE = 1 << 4
+REASON_EAGER = 1 << 5
+REASON_BETRAYAL = 1 << 6
+REASON_DISTANCE = 1 << 7
+REASON_FLUX = 1 << 8
+REASON_PROFIT = 1 << 9
+REASON_STABILITY = 1 << 10
+REASON_OPTIMISTIC = 1 << 11
+REASON_FRUSTRATED = 1 << 12
+REASON_RISK = 1 << 13
+REASON_RECIPROCATING = 1 << 14
+REASON_RETALIATING = 1 << 15
+
+
+def cooperation_prob(trust: float, fairness: float, attach: int, total_games: int,
+                     times_betrayed: int, profit_goal: bool, stability_goal: bool,
+                     emotional_state: float, stake: float, balance: float,
+                     risk_tolerance: float, reciprocity: float, last_outcome: int,
+                     flux: float):
+    """Probability of cooperating and a bitmask of the reasons behind it
+
+    flux is the DISORGANIZED agent's random mood swing, drawn by the caller.
+    """
+    # Base probability of cooperation
+    p = 0.5
+    mask = REASON_BASE
+
+    # Trust influence (0-100 -> 0-40%)
+    trust_effect = (trust / 100) * 0.4
+    p += trust_effect
+    if trust_effect > 0.2:
+        mask |= REASON_STRONG_TRUST
+    elif trust_effect < 0.1:
+        mask |= REASON_WARY
+
+    # Ethics influence
+    p += fairness * 0.2
+    if fairness > 0.7:
+        mask |= REASON_FAIRNESS
+
+    # Attachment style modifiers
+    if attach == ATTACH_SECURE:
+        p += 0.2
+        mask |= REASON_SECURE
+    elif attach == ATTACH_ANXIOUS:
+        if total_games < 3:
+            p += 0.3
+            mask |= REASON_EAGER
+        if times_betrayed > 0:
+            p -= times_betrayed * 0.15
+            mask |= REASON_BETRAYAL
+    elif attach == ATTACH_AVOIDANT:
+        p -= 0.3
+        mask |= REASON_DISTANCE
+    else:
+        p += flux
+        mask |= REASON_FLUX
+
+    # Goal-based modifiers
+    if profit_goal:
+        p -= 0.1
+        mask |= REASON_PROFIT
+    if stability_goal:
+        p += 0.15
+        mask |= REASON_STABILITY
+
+    # Emotional state influence
+    emotion_mod = (emotional_state - 50) / 100 * 0.2
+    p += emotion_mod
+    if emotion_mod > 0.05:
+        mask |= REASON_OPTIMISTIC
+    elif emotion_mod < -0.05:
+        mask |= REASON_FRUSTRATED
+
+    # Risk tolerance
+    if stake > balance * risk_tolerance:
+        p -= 0.15
+        mask |= REASON_RISK
+
+    # Tit-for-tat strategy (reciprocity)
+    if total_games > 0 and reciprocity > 0.5:
+        if last_outcome == OUTCOME_COOPERATED:
+            p += 0.25
+            mask |= REASON_RECIPROCATING
+        elif last_outcome == OUTCOME_DEFECTED:
+            p -= 0.25
+            mask |= REASON_RETALIATING
+
+    return max(0.0, min(1.0, p)), mask
+
+
+def trust_delta(my_move: bool, partner_move: bool, attach: int) -> float:
+    """Change in trust after a game, given both moves and the agent's attachment style"""
+    if my_move and partner_move:
+        # Mutual cooperation - trust increases
+        return 5.0
+    elif not my_move and not partner_move:
+        # Mutual defection - trust decreases slightly
+        return -2.0
+    elif my_move and not partner_move:
+        # Betrayed - trust decreases significantly
+        delta = -15.0
+        # Attachment style affects reaction
+        if attach == ATTACH_ANXIOUS:
+            delta *= 2.0  # Dramatic reaction
+        elif attach == ATTACH_AVOIDANT:
+            delta *= 0.5  # Minimal reaction
+        return delta
+    else:
+        # Exploited partner - trust decreases (guilt)
+        return -5.0
+
+
+def trust_update(trust: float, my_move: bool, partner_move: bool, attach: int) -> float:
+    """Trust score after a game, given both moves and the agent's attachment style"""
+    return max(0.0, min(100.0, trust + trust_delta(my_move, partner_move, attach)))
+
+
+if HAS_NUMBA:
+    # Called once per decision, so these are compiled lazily and cached on disk
+    cooperation_prob = njit(cache=True)(cooperation_prob)
+    trust_delta = njit(cache=True)(trust_delta)
+    trust_update = njit(cache=True)(trust_update)
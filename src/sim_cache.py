@@ -0,0 +1,145 @@
+"""
+On-disk memoization of whole simulation runs for the console demos
+
+A run is keyed by the agents' profiles, the RNG state, the number of rounds and
+the engine/agent source plus the source of the module driving the rounds, so
+re-running a seeded demo replays its recorded output instead of recomputing
+every round.
+
+Agent wallets are stripped before a run is written, but entries are still
+unauthenticated pickles: keep .cache/ local and never share or restore it from
+elsewhere, since loading a tampered entry runs arbitrary code.
+"""
+import contextlib
+import dataclasses
+import hashlib
+import inspect
+import io
+import marshal
+import os
+import pickle
+import random
+import sys
+from typing import Any, Callable, Iterator, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from agent import Agent
+    from game_engine import GameEngine
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache')
+
+# Results depend on these modules, so editing them invalidates every cached run
+_SOURCE_FILES = ('agent.py', 'game_engine.py', 'kernels.py')
+_WALLET_FIELDS = ('address', 'private_key')
+
+def sim_key(agents: List['Agent'], num_rounds: int,
+            simulate: Optional[Callable[['GameEngine', int], None]] = None) -> str:
+    """Hash everything that determines the outcome of a simulation run"""
+    h = hashlib.blake2b(digest_size=16)
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for filename in _SOURCE_FILES:
+        with open(os.path.join(src_dir, filename), 'rb') as f:
+            h.update(f.read())
+    if simulate is not None:
+        # The round loop and everything it prints live in the caller's module
+        try:
+            with open(inspect.getsourcefile(simulate), 'rb') as f:
+                h.update(f.read())
+        except (TypeError, OSError):
+            h.update(marshal.dumps(simulate.__code__))
+    for agent in agents:
+        # Wallets are freshly generated each run and don't affect an off-chain simulation
+        profile = [getattr(agent.profile, f.name) for f in dataclasses.fields(agent.profile)
+                   if f.name not in _WALLET_FIELDS]
+        h.update(repr(profile).encode())
+        h.update(repr(agent.balance).encode())
+    h.update(repr(random.getstate()).encode())
+    h.update(str(num_rounds).encode())
+    return h.hexdigest()
+
+def _wallets(agents: List['Agent']) -> List[tuple]:
+    return [tuple(getattr(agent.profile, name) for name in _WALLET_FIELDS) for agent in agents]
+
+def _set_wallets(agents: List['Agent'], wallets: List[tuple]) -> None:
+    for agent, wallet in zip(agents, wallets):
+        for name, value in zip(_WALLET_FIELDS, wallet):
+            setattr(agent.profile, name, value)
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"sim_{key}.pkl")
+
+def load_run(key: str) -> Optional[Any]:
+    """Load a cached run, or None if there is none (or it can't be read)"""
+    try:
+        with open(_cache_path(key), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable simulation cache: {e}", file=sys.stderr)
+        return None
+
+def save_run(key: str, value: Any) -> None:
+    """Write a run to the cache atomically"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+class _Tee(io.TextIOBase):
+    """Text stream that writes to several streams at once"""
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text: str) -> int:
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+@contextlib.contextmanager
+def recording_output() -> Iterator[io.StringIO]:
+    """Keep printing to stdout while also capturing everything printed"""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(_Tee(sys.stdout, buffer)):
+        yield buffer
+
+def run_cached(engine: 'GameEngine', num_rounds: int,
+               simulate: Callable[['GameEngine', int], None], use_cache: bool = True) -> 'GameEngine':
+    """Run simulate(engine, num_rounds), or replay an identical earlier run from disk
+
+    On a cache hit the recorded output is printed again, the RNG is left in the state
+    the original run ended in, and the finished engine (with its agents, given the
+    wallets of engine's agents) is returned.
+    Only off-chain runs are cached; an engine in blockchain mode always simulates.
+    Callers should only enable the cache for seeded runs, since an unseeded RNG
+    state never repeats and its entry could never be hit again.
+    """
+    use_cache = use_cache and engine.blockchain is None
+    key = sim_key(engine.agents, num_rounds, simulate)
+    cached = load_run(key) if use_cache else None
+    if cached is not None:
+        cached_engine, output, rng_state = cached
+        print(output, end='')
+        random.setstate(rng_state)
+        # Cached agents carry no wallets; hand them this run's
+        _set_wallets(cached_engine.agents, _wallets(engine.agents))
+        return cached_engine
+
+    with recording_output() as output:
+        simulate(engine, num_rounds)
+    if use_cache:
+        # Never write private keys to disk
+        wallets = _wallets(engine.agents)
+        _set_wallets(engine.agents, [(None,) * len(_WALLET_FIELDS)] * len(wallets))
+        try:
+            save_run(key, (engine, output.getvalue(), random.getstate()))
+        finally:
+            _set_wallets(engine.agents, wallets)
+    return engine
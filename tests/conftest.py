@@ -0,0 +1,73 @@
+"""
+Shared pytest fixtures for the agent test suite
+"""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# src modules import each other as top-level modules (e.g. agent -> kernels); tests
+# import them the same way so each module, and each of its classes, is loaded once
+sys.path.insert(0, os.path.join(REPO_ROOT, 'src'))
+
+# Numba reads these when the kernels are first imported, which happens just below.
+# Compiled kernels are cached locally in .numba_cache/ (ignored by git) so later runs,
+# and CI if it caches the directory, skip compilation; under coverage the kernels run
+# as plain Python so their lines are measured.
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(REPO_ROOT, '.numba_cache'))
+_coverage = sys.modules.get("coverage")
+if _coverage is not None and _coverage.Coverage.current() is not None:
+    os.environ["NUMBA_DISABLE_JIT"] = "1"
+
+from agent import Agent, AgentProfile, AttachmentStyle, Goal
+
+# Sampling tests use 4-sigma binomial bounds that hold for any seed; seeding only makes runs reproducible
+SEED = 1234
+
+
+@pytest.fixture(autouse=True)
+def _seed_random():
+    """Seed the RNG per test so decisions don't depend on which xdist worker runs it"""
+    random.seed(SEED)
+    np.random.seed(SEED)
+    yield
+
+
+def create_test_agent(name="TestAgent", attachment=AttachmentStyle.SECURE):
+    """Helper to create test agent"""
+    profile = AgentProfile(
+        name=name,
+        attachment_style=attachment,
+        goals=(Goal.PROFIT,),
+        risk_tolerance=0.5,
+        ethics_fairness=0.5,
+        ethics_reciprocity=0.7,
+        skill_negotiation=0.5,
+        skill_patience=0.5,
+        skill_adaptability=0.5,
+        preferred_partner_goals=(Goal.STABILITY,),
+        preferred_trust_threshold=50.0
+    )
+    return Agent(profile, initial_balance=100.0)
+
+
+@pytest.fixture
+def make_agent():
+    """Factory for test agents: make_agent(name="TestAgent", attachment=AttachmentStyle.SECURE)"""
+    return create_test_agent
+
+
+# Agents are rebuilt for every test: tests mutate relationships and profiles, and
+# constructing one is about ten times cheaper than deep-copying a shared template
+@pytest.fixture
+def secure_agent():
+    return create_test_agent("Secure", AttachmentStyle.SECURE)
+
+
+@pytest.fixture
+def partner_agent():
+    return create_test_agent("Partner")
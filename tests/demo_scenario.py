@@ -2,35 +2,20 @@
 Demo scenario showcasing autonomous agent behavior
 Simulates 100+ interactions to demonstrate emergent patterns
 """
+import argparse
+import asyncio
+import random
 import sys
 sys.path.append('src')
 
 from agent_utils import create_agent_population
-from game_engine import GameEngine
+from game_engine import GameEngine, configure_logging
+from sim_cache import run_cached
 import pandas as pd
 
-def run_demo():
-    """Run autonomous agent simulation"""
-    print("🎮 AI Agent Dating Economy Demo")
-    print("=" * 60)
-    
-    # Create 10 diverse agents
-    print("\n📋 Creating 10 autonomous agents...")
-    agents = create_agent_population(10, 10.0)
-    
-    print("\n👥 Agent Roster:")
-    for agent in agents:
-        print(f"  {agent.profile.name:10} | {agent.profile.attachment_style.value:12} | Goals: {', '.join(g.value for g in agent.profile.goals)}")
-    
-    # Initialize game engine
-    engine = GameEngine(agents)
-    
-    # Run multiple rounds
-    total_rounds = 20
-    print(f"\n🎲 Running {total_rounds} rounds of autonomous interactions...")
-    print("-" * 60)
-    
-    for round_num in range(1, total_rounds + 1):
+def run_rounds(engine, num_rounds):
+    """Play num_rounds rounds, printing every match and evaluating bonds every 5 rounds"""
+    for round_num in range(1, num_rounds + 1):
         matches = engine.create_matches()
         
         if not matches:
@@ -38,8 +23,8 @@ def run_demo():
             continue
         
         print(f"\n📍 Round {round_num}:")
-        for agent1, agent2 in matches:
-            result = engine.run_round(agent1, agent2)
+        results = asyncio.run(engine.run_round_concurrent(matches))
+        for result in results:
             if result:
                 outcome_icon = "🤝" if result['agent1_move'] == 'cooperate' and result['agent2_move'] == 'cooperate' else \
                              "💔" if result['agent1_move'] != result['agent2_move'] else "⚔️"
@@ -54,6 +39,40 @@ def run_demo():
                 if not continues:
                     mem1 = agent1.relationships.get(agent2.profile.name)
                     print(f"    BREAKUP: {agent1.profile.name} & {agent2.profile.name} (Trust: {mem1.trust_score if mem1 else 'N/A':.1f})")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Autonomous agent simulation demo")
+    parser.add_argument('--seed', type=int, help="Seed the RNG for a reproducible (and cacheable) run")
+    parser.add_argument('--no-cache', action='store_true', help="Always simulate instead of replaying a cached run")
+    return parser.parse_args(argv)
+
+def run_demo():
+    """Run autonomous agent simulation"""
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    print("🎮 AI Agent Dating Economy Demo")
+    print("=" * 60)
+    
+    # Create 10 diverse agents
+    print("\n📋 Creating 10 autonomous agents...")
+    agents = create_agent_population(10, 10.0)
+    
+    print("\n👥 Agent Roster:")
+    for agent in agents:
+        print(f"  {agent.profile.name:10} | {agent.profile.attachment_style.value:12} | Goals: {', '.join(g.value for g in agent.profile.goals)}")
+    
+    # Initialize game engine
+    engine = GameEngine(agents)
+    
+    # Run multiple rounds
+    total_rounds = 20
+    print(f"\n🎲 Running {total_rounds} rounds of autonomous interactions...")
+    print("-" * 60)
+    
+    engine = run_cached(engine, total_rounds, run_rounds, use_cache=args.seed is not None and not args.no_cache)
+    agents = engine.agents
     
     # Final statistics
     print("\n" + "=" * 60)
@@ -61,6 +80,7 @@ def run_demo():
     print("=" * 60)
     
     stats = engine.get_statistics()
+    agents_by_name = {a.profile.name: a for a in agents}
     print(f"\n  Total Games Played: {stats['total_games']}")
     print(f"  Active Bonds Remaining: {stats['active_bonds']}")
     
@@ -68,7 +88,7 @@ def run_demo():
     print("\n💰 Final Balances:")
     balances = sorted(stats['agent_balances'].items(), key=lambda x: x[1], reverse=True)
     for i, (name, balance) in enumerate(balances, 1):
-        agent = next(a for a in agents if a.profile.name == name)
+        agent = agents_by_name[name]
         profit = balance - 10.0
         profit_str = f"+{profit:.2f}" if profit > 0 else f"{profit:.2f}"
         print(f"  #{i}. {name:10} | {balance:.2f} MON ({profit_str}) | {agent.profile.attachment_style.value}")
@@ -77,7 +97,7 @@ def run_demo():
     print("\n⭐ Reputation Scores:")
     reps = sorted(stats['agent_reputations'].items(), key=lambda x: x[1], reverse=True)
     for name, rep in reps:
-        agent = next(a for a in agents if a.profile.name == name)
+        agent = agents_by_name[name]
         print(f"  {name:10} | {rep:.1f} | {agent.profile.attachment_style.value}")
     
     # Behavioral insights
@@ -95,8 +115,8 @@ def run_demo():
         most_coop = max(coop_rates.items(), key=lambda x: x[1])
         least_coop = min(coop_rates.items(), key=lambda x: x[1])
         
-        most_agent = next(a for a in agents if a.profile.name == most_coop[0])
-        least_agent = next(a for a in agents if a.profile.name == least_coop[0])
+        most_agent = agents_by_name[most_coop[0]]
+        least_agent = agents_by_name[least_coop[0]]
         
         print(f"  Most Cooperative: {most_coop[0]} ({most_agent.profile.attachment_style.value}) - {most_coop[1]:.1f}% cooperation rate")
         print(f"  Least Cooperative: {least_coop[0]} ({least_agent.profile.attachment_style.value}) - {least_coop[1]:.1f}% cooperation rate")
@@ -104,12 +124,13 @@ def run_demo():
     # Find strongest bond
     all_bonds = []
     for agent in agents:
+        name = agent.profile.name
         for partner_name, memory in agent.relationships.items():
             if memory.total_games > 0:
                 # Only add once (avoid duplicates)
-                if agent.profile.name < partner_name:
+                if name < partner_name:
                     all_bonds.append({
-                        'agent1': agent.profile.name,
+                        'agent1': name,
                         'agent2': partner_name,
                         'trust': memory.trust_score,
                         'bond': memory.bond_strength,
@@ -129,4 +150,5 @@ def run_demo():
     print("  - Emergent patterns: Some agents thrived, others struggled")
 
 if __name__ == "__main__":
+    configure_logging()
     run_demo()
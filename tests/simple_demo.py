@@ -2,6 +2,8 @@
 Simple console-based demo that doesn't require pandas/streamlit/plotly
 Run this to test the agent logic without dependencies
 """
+import argparse
+import asyncio
 import sys
 import os
 
@@ -9,7 +11,8 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from agent import Agent, AgentProfile, AttachmentStyle, Goal
-from game_engine import GameEngine
+from game_engine import GameEngine, configure_logging
+from sim_cache import run_cached
 import random
 
 def create_simple_agents(num_agents=10):
@@ -28,7 +31,7 @@ def create_simple_agents(num_agents=10):
     agents = []
     for i in range(num_agents):
         num_goals = random.randint(1, 3)
-        goals = random.sample(list(Goal), num_goals)
+        goals = tuple(random.sample(list(Goal), num_goals))
         
         profile = AgentProfile(
             name=names[i],
@@ -40,7 +43,7 @@ def create_simple_agents(num_agents=10):
             skill_negotiation=random.uniform(0.3, 0.9),
             skill_patience=random.uniform(0.3, 0.9),
             skill_adaptability=random.uniform(0.3, 0.9),
-            preferred_partner_goals=random.sample(list(Goal), random.randint(1, 2)),
+            preferred_partner_goals=tuple(random.sample(list(Goal), random.randint(1, 2))),
             preferred_trust_threshold=random.uniform(30, 70),
             reputation_score=random.uniform(40, 60)
         )
@@ -49,32 +52,8 @@ def create_simple_agents(num_agents=10):
     
     return agents
 
-def main():
-    print("=" * 70)
-    print("AI AGENT DATING ECONOMY - CONSOLE DEMO")
-    print("=" * 70)
-    print("\nThis simplified demo tests the core agent logic without needing")
-    print("pandas, streamlit, or plotly (which require C++ compilation on Windows)")
-    print()
-    
-    # Create agents
-    print("[*] Creating 10 autonomous agents...\n")
-    agents = create_simple_agents(10)
-    
-    print("AGENT ROSTER:")
-    print("-" * 70)
-    for agent in agents:
-        goals_str = ", ".join(g.value for g in agent.profile.goals)
-        print(f"  {agent.profile.name:10} | {agent.profile.attachment_style.value:14} | {goals_str}")
-    
-    # Initialize game engine
-    engine = GameEngine(agents)
-    
-    # Run simulation
-    num_rounds = 15
-    print(f"\n[*] Running {num_rounds} rounds of autonomous agent interactions...")
-    print("=" * 70)
-    
+def run_rounds(engine, num_rounds):
+    """Play num_rounds rounds, printing every match and breakup"""
     for round_num in range(1, num_rounds + 1):
         matches = engine.create_matches()
         
@@ -84,8 +63,8 @@ def main():
         print(f"\n[ROUND {round_num}]:")
         print("-" * 70)
         
-        for agent1, agent2 in matches:
-            result = engine.run_round(agent1, agent2)
+        results = asyncio.run(engine.run_round_concurrent(matches))
+        for result in results:
             if result:
                 # Format output
                 a1 = result['agent1_name']
@@ -117,6 +96,45 @@ def main():
                     mem1 = agent1.relationships.get(agent2.profile.name)
                     trust = mem1.trust_score if mem1 else 0
                     print(f"     {agent1.profile.name} & {agent2.profile.name} (Trust: {trust:.1f})")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Console demo of the agent dating economy")
+    parser.add_argument('--seed', type=int, help="Seed the RNG for a reproducible (and cacheable) run")
+    parser.add_argument('--no-cache', action='store_true', help="Always simulate instead of replaying a cached run")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    print("=" * 70)
+    print("AI AGENT DATING ECONOMY - CONSOLE DEMO")
+    print("=" * 70)
+    print("\nThis simplified demo tests the core agent logic without needing")
+    print("pandas, streamlit, or plotly (which require C++ compilation on Windows)")
+    print()
+    
+    # Create agents
+    print("[*] Creating 10 autonomous agents...\n")
+    agents = create_simple_agents(10)
+    
+    print("AGENT ROSTER:")
+    print("-" * 70)
+    for agent in agents:
+        goals_str = ", ".join(g.value for g in agent.profile.goals)
+        print(f"  {agent.profile.name:10} | {agent.profile.attachment_style.value:14} | {goals_str}")
+    
+    # Initialize game engine
+    engine = GameEngine(agents)
+    
+    # Run simulation
+    num_rounds = 15
+    print(f"\n[*] Running {num_rounds} rounds of autonomous agent interactions...")
+    print("=" * 70)
+    
+    engine = run_cached(engine, num_rounds, run_rounds, use_cache=args.seed is not None and not args.no_cache)
+    agents = engine.agents
     
     # Final statistics
     print("\n" + "=" * 70)
@@ -159,9 +177,10 @@ def main():
     # Find strongest bond
     all_bonds = []
     for agent in agents:
+        name = agent.profile.name
         for partner_name, memory in agent.relationships.items():
-            if memory.total_games > 0 and agent.profile.name < partner_name:
-                all_bonds.append((agent.profile.name, partner_name, memory.bond_strength, 
+            if memory.total_games > 0 and name < partner_name:
+                all_bonds.append((name, partner_name, memory.bond_strength, 
                                 memory.trust_score, memory.total_games))
     
     if all_bonds:
@@ -179,4 +198,5 @@ def main():
     print("\n" + "=" * 70)
 
 if __name__ == "__main__":
+    configure_logging()
     main()
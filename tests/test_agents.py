@@ -1,90 +1,82 @@
 """
 Test suite for agent autonomy and decision-making
 """
-import pytest
-from src.agent import Agent, AgentProfile, AttachmentStyle, Goal
+import math
 import random
+from dataclasses import replace
+import pytest
+from agent import _OUTCOME_CODES, AgentProfile, AttachmentStyle, Goal, RelationshipMemory, compute_trust_delta
+from kernels import ATTACH_ANXIOUS, ATTACH_SECURE, OUTCOME_NONE, cooperation_prob, trust_update
 
-def create_test_agent(name="TestAgent", attachment=AttachmentStyle.SECURE):
-    """Helper to create test agent"""
-    profile = AgentProfile(
-        name=name,
-        attachment_style=attachment,
-        goals=[Goal.PROFIT],
-        risk_tolerance=0.5,
-        ethics_fairness=0.5,
-        ethics_reciprocity=0.7,
-        skill_negotiation=0.5,
-        skill_patience=0.5,
-        skill_adaptability=0.5,
-        preferred_partner_goals=[Goal.STABILITY],
-        preferred_trust_threshold=50.0
-    )
-    return Agent(profile, initial_balance=100.0)
+def _mk_rel(partner_name="Partner", **overrides):
+    """Helper to create a relationship memory with the given fields set"""
+    return RelationshipMemory(partner_name=partner_name, **overrides)
+
+# (agent style, partner style) pairings the original trial compared
+ATTACHMENT_PAIRINGS = [
+    (AttachmentStyle.SECURE, AttachmentStyle.ANXIOUS),
+    (AttachmentStyle.ANXIOUS, AttachmentStyle.SECURE),
+    (AttachmentStyle.AVOIDANT, AttachmentStyle.SECURE),
+]
 
-def test_attachment_styles_produce_different_behaviors():
+@pytest.mark.parametrize("style,partner_style", ATTACHMENT_PAIRINGS)
+def test_sampled_decisions_follow_cooperation_probability(style, partner_style, make_agent):
+    """Test that decide_move_batch cooperates about as often as its probability says"""
+    agent = make_agent(style.name.title(), style)
+    partner = make_agent(partner_style.name.title(), partner_style)
+    expected_prob = agent._cooperation_probability(partner, 1.0)
+    
+    trials = 30
+    coop_count = agent.decide_move_batch(partner, 1.0, trials).sum()
+    
+    # Allow four binomial standard deviations around the expected count
+    expected = trials * expected_prob
+    margin = 4 * math.sqrt(trials * expected_prob * (1 - expected_prob)) + 1
+    assert abs(coop_count - expected) <= margin, \
+        f"{style.name.title()} cooperated {coop_count}/{trials} times, expected about {expected:.0f}"
+
+def test_attachment_styles_produce_different_behaviors(make_agent):
     """Test that different attachment styles lead to different decisions"""
-    # Create agents with different attachment styles
-    secure = create_test_agent("Secure", AttachmentStyle.SECURE)
-    anxious = create_test_agent("Anxious", AttachmentStyle.ANXIOUS)
-    avoidant = create_test_agent("Avoidant", AttachmentStyle.AVOIDANT)
-    
-    # Run many trials to see behavioral differences
-    secure_coop_count = 0
-    anxious_coop_count = 0
-    avoidant_coop_count = 0
-    
-    trials = 100
-    for _ in range(trials):
-        if secure.decide_move(anxious, 1.0):
-            secure_coop_count += 1
-        if anxious.decide_move(secure, 1.0):
-            anxious_coop_count += 1
-        if avoidant.decide_move(secure, 1.0):
-           avoidant_coop_count += 1
-    
-    # Secure should cooperate most, avoidant least
-    assert secure_coop_count > avoidant_coop_count, \
-        f"Secure ({secure_coop_count}) should cooperate more than Avoidant ({avoidant_coop_count})"
-    
-    # Anxious should cooperate a lot initially
-    assert anxious_coop_count > avoidant_coop_count, \
-        f"Anxious ({anxious_coop_count}) should cooperate more than Avoidant ({avoidant_coop_count})"
+    trials = 30
+    coop_counts = {}
+    for style, partner_style in ATTACHMENT_PAIRINGS:
+        agent = make_agent(style.name.title(), style)
+        partner = make_agent(partner_style.name.title(), partner_style)
+        coop_counts[style] = agent.decide_move_batch(partner, 1.0, trials).sum()
+    
+    # Secure and Anxious (eager early on) should cooperate more than Avoidant
+    for style in (AttachmentStyle.SECURE, AttachmentStyle.ANXIOUS):
+        assert coop_counts[style] > coop_counts[AttachmentStyle.AVOIDANT], \
+            f"{style.name.title()} ({coop_counts[style]}) should cooperate more than Avoidant ({coop_counts[AttachmentStyle.AVOIDANT]})"
 
-def test_trust_affects_cooperation():
+def test_trust_affects_cooperation(secure_agent, partner_agent):
     """Test that trust score affects cooperation probability"""
-    agent = create_test_agent()
-    partner = create_test_agent("Partner")
+    agent, partner = secure_agent, partner_agent
     
     # Manually set high trust
-    agent.relationships[partner.profile.name] = type('obj', (object,), {
-        'partner_name': partner.profile.name,
-        'trust_score': 90.0,
-        'total_games': 5,
-        'times_cooperated': 5,
-        'times_defected': 0,
-        'times_betrayed': 0,
-        'times_exploited': 0,
-        'bond_strength': 80.0,
-        'total_earnings': 10.0,
-        'last_interaction_outcome': 'cooperated'
-    })()
-    
-    high_trust_coop = sum(agent.decide_move(partner, 1.0) for _ in range(100))
+    agent.relationships[partner.profile.name] = _mk_rel(
+        trust_score=90.0,
+        total_games=5,
+        times_cooperated=5,
+        bond_strength=80.0,
+        total_earnings=10.0,
+        last_interaction_outcome='cooperated',
+    )
+    
+    high_trust_prob = agent._cooperation_probability(partner, 1.0)
     
     # Manually set low trust
     agent.relationships[partner.profile.name].trust_score = 10.0
     agent.relationships[partner.profile.name].last_interaction_outcome = 'defected'
     
-    low_trust_coop = sum(agent.decide_move(partner, 1.0) for _ in range(100))
+    low_trust_prob = agent._cooperation_probability(partner, 1.0)
     
-    assert high_trust_coop > low_trust_coop, \
-        f"High trust ({high_trust_coop}) should lead to more cooperation than low trust ({low_trust_coop})"
+    assert high_trust_prob > low_trust_prob, \
+        f"High trust ({high_trust_prob}) should lead to more cooperation than low trust ({low_trust_prob})"
 
-def test_betrayal_reduces_trust():
+def test_betrayal_reduces_trust(secure_agent, partner_agent):
     """Test that betrayal reduces trust score"""
-    agent = create_test_agent()
-    partner = create_test_agent("Partner")
+    agent, partner = secure_agent, partner_agent
     
     # Simulate initial cooperation
     agent.update_after_game(partner, True, True, 1.0, 1.5)
@@ -97,111 +89,102 @@ def test_betrayal_reduces_trust():
     assert betrayal_trust < initial_trust, \
         f"Trust after betrayal ({betrayal_trust}) should be less than initial ({initial_trust})"
 
+@pytest.mark.parametrize("style", [AttachmentStyle.SECURE, AttachmentStyle.ANXIOUS, AttachmentStyle.AVOIDANT])
+def test_cooperation_probability_matches_kernel(style, make_agent):
+    """Test that the agent's decision arithmetic agrees with kernels.cooperation_prob"""
+    agent = make_agent(style.name.title(), style)
+    for trust, games, betrayed, outcome in [(10.0, 0, 0, None), (45.0, 4, 1, 'defected'), (90.0, 2, 0, 'cooperated')]:
+        memory = _mk_rel(trust_score=trust, total_games=games, times_betrayed=betrayed,
+                         last_interaction_outcome=outcome)
+        reasons = []
+        p = agent._memory_cooperation_probability(memory, 1.0, reasons)
+        
+        expected_p, mask = cooperation_prob(
+            trust, agent.profile.ethics_fairness, agent._attach_code, games, betrayed,
+            True, False, agent.emotional_state, 1.0, agent.balance, agent.profile.risk_tolerance,
+            agent.profile.ethics_reciprocity, _OUTCOME_CODES.get(outcome, OUTCOME_NONE), 0.0
+        )
+        assert p == pytest.approx(expected_p)
+        assert len(reasons) == bin(mask).count("1")
+
+def test_trust_update_stays_in_range():
+    """Test that the trust kernel clamps scores to 0-100"""
+    assert trust_update(98.0, True, True, ATTACH_SECURE) == 100.0
+    assert trust_update(10.0, True, False, ATTACH_ANXIOUS) == 0.0
+    assert trust_update(50.0, False, False, ATTACH_SECURE) == 48.0
+
 def test_anxious_reacts_more_strongly_to_betrayal():
     """Test that anxious agents have stronger reactions to betrayal"""
-    secure = create_test_agent("Secure", AttachmentStyle.SECURE)
-    anxious = create_test_agent("Anxious", AttachmentStyle.ANXIOUS)
-    partner = create_test_agent("Partner")
-    
-    # Establish baseline trust
-    secure.relationships[partner.profile.name] = type('obj', (object,), {
-        'partner_name': partner.profile.name,
-        'trust_score': 70.0,
-        'times_cooperated': 0,
-        'times_defected': 0,
-        'times_betrayed': 0,
-        'times_exploited': 0,
-        'total_games': 0,
-        'bond_strength': 50.0,
-        'total_earnings': 0.0,
-        'last_interaction_outcome': None
-    })()
-    
-    anxious.relationships[partner.profile.name] = type('obj', (object,), {
-        'partner_name': partner.profile.name,
-        'trust_score': 70.0,
-        'times_cooperated': 0,
-        'times_defected': 0,
-        'times_betrayed': 0,
-        'times_exploited': 0,
-        'total_games': 0,
-        'bond_strength': 50.0,
-        'total_earnings': 0.0,
-        'last_interaction_outcome': None
-    })()
-    
-    # Simulate betrayal
-    secure.update_after_game(partner, True, False, 1.0, 0.0)
-    anxious.update_after_game(partner, True, False, 1.0, 0.0)
-    
-    secure_trust_drop = 70.0 - secure.relationships[partner.profile.name].trust_score
-    anxious_trust_drop = 70.0 - anxious.relationships[partner.profile.name].trust_score
-    
-    assert anxious_trust_drop > secure_trust_drop, \
-        f"Anxious trust drop ({anxious_trust_drop}) should be greater than Secure ({secure_trust_drop})"
+    secure_delta = compute_trust_delta(AttachmentStyle.SECURE, True, False)
+    anxious_delta = compute_trust_delta(AttachmentStyle.ANXIOUS, True, False)
+    
+    assert anxious_delta < secure_delta < 0, \
+        f"Anxious trust drop ({-anxious_delta}) should be greater than Secure ({-secure_delta})"
 
-def test_decisions_are_non_deterministic():
+def test_decisions_are_non_deterministic(secure_agent, partner_agent):
     """Test that agents don't always make the same decision given same inputs"""
-    agent = create_test_agent()
-    partner = create_test_agent("Partner")
+    # decide_move samples against this probability, so anything strictly
+    # between 0 and 1 can go either way
+    p = secure_agent._cooperation_probability(partner_agent, 1.0)
     
-    # Run same scenario many times
-    decisions = [agent.decide_move(partner, 1.0) for _ in range(50)]
-    
-    # Should have some variation (not all True or all False)
-    assert len(set(decisions)) > 1, \
-        "Agent should show non-deterministic behavior, not all same decisions"
+    assert 0.0 < p < 1.0, \
+        f"Agent should show non-deterministic behavior, but cooperates with probability {p}"
+
+def test_decide_move_fast_matches_decide_move(secure_agent, partner_agent):
+    """Test that deciding against a pre-fetched memory matches the partner lookup"""
+    agent, partner = secure_agent, partner_agent
+    memory = agent.relationships[partner.profile.name] = _mk_rel(trust_score=10.0)
+    
+    for seed in range(20):
+        random.seed(seed)
+        move = agent.decide_move(partner, 1.0)
+        reason = agent.last_decision_reason
+        random.seed(seed)
+        assert agent.decide_move_fast(memory, 1.0) == move
+        assert agent.last_decision_reason == reason
+    
+    # Reasons name the partner from the memory itself
+    reasons = []
+    agent._memory_cooperation_probability(_mk_rel("Stranger", trust_score=10.0), 1.0, reasons)
+    assert "Wary of Stranger" in reasons
 
-def test_compatibility_scoring():
+def test_compatibility_scoring(secure_agent):
     """Test that compatibility calculation produces reasonable scores"""
-    # Create agents with very compatible profiles
-    agent1 = create_test_agent("Agent1", AttachmentStyle.SECURE)
-    agent1.profile.goals = [Goal.STABILITY, Goal.LEARNING]
+    # Very compatible profiles, and an incompatible one
+    stable = replace(secure_agent.profile, goals=(Goal.STABILITY, Goal.LEARNING))
+    profit_avoidant = replace(secure_agent.profile, goals=(Goal.PROFIT,),
+                              attachment_style=AttachmentStyle.AVOIDANT)
     
-    agent2 = create_test_agent("Agent2", AttachmentStyle.SECURE)
-    agent2.profile.goals = [Goal.STABILITY, Goal.LEARNING]
-    
-    # Create incompatible agent
-    agent3 = create_test_agent("Agent3", AttachmentStyle.AVOIDANT)
-    agent3.profile.goals = [Goal.PROFIT]
-    
-    compat_high = agent1._calculate_compatibility(agent2)
-    compat_low = agent1._calculate_compatibility(agent3)
+    compat_high = AgentProfile.compatibility(stable, stable)
+    compat_low = AgentProfile.compatibility(stable, profit_avoidant)
     
     assert compat_high > compat_low, \
         f"Compatible agents ({compat_high}) should score higher than incompatible ({compat_low})"
 
-def test_agent_wants_rematch_depends_on_attachment():
+# With trust=55, Secure and Anxious should want a rematch, but not Avoidant (needs 70+)
+@pytest.mark.parametrize("style,expected", [
+    (AttachmentStyle.SECURE, True),
+    (AttachmentStyle.ANXIOUS, True),
+    (AttachmentStyle.AVOIDANT, False),
+])
+def test_agent_wants_rematch_depends_on_attachment(style, expected, partner_agent, make_agent):
     """Test that rematch willingness varies by attachment style"""
-    partner = create_test_agent("Partner")
-    
-    # Create relationship with medium trust (55)
-    def create_memory(agent, trust=55.0):
-        agent.relationships[partner.profile.name] = type('obj', (object,), {
-            'partner_name': partner.profile.name,
-            'trust_score': trust,
-            'times_cooperated': 5,
-            'times_defected': 5,
-            'times_betrayed': 2,
-            'times_exploited': 0,
-            'total_games': 10,
-            'bond_strength': 40.0,
-            'total_earnings': 2.0,
-            'last_interaction_outcome': 'cooperated'
-        })()
-    
-    secure = create_test_agent("Secure", AttachmentStyle.SECURE)
-    anxious = create_test_agent("Anxious", AttachmentStyle.ANXIOUS)
-    avoidant = create_test_agent("Avoidant", AttachmentStyle.AVOIDANT)
-    
-    create_memory(secure)
-    create_memory(anxious)
-    create_memory(avoidant)
-    
-    # With trust=55, Secure and Anxious should want rematch, but not Avoidant (needs 70+)
-    assert secure.wants_rematch(partner), "Secure should want rematch with trust=55"
-    assert anxious.wants_rematch(partner), "Anxious should want rematch with trust=55"
-    assert not avoidant.wants_rematch(partner), "Avoidant should NOT want rematch with trust=55"
+    agent = make_agent(style.name.title(), style)
+    
+    # Relationship with medium trust (55)
+    agent.relationships[partner_agent.profile.name] = _mk_rel(
+        trust_score=55.0,
+        times_cooperated=5,
+        times_defected=5,
+        times_betrayed=2,
+        total_games=10,
+        bond_strength=40.0,
+        total_earnings=2.0,
+        last_interaction_outcome='cooperated',
+    )
+    
+    assert agent.wants_rematch(partner_agent) is expected, \
+        f"{style.name.title()} wants_rematch should be {expected} with trust=55"
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
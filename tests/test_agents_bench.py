@@ -0,0 +1,18 @@
+"""
+Benchmarks for the agent decision and update hot paths
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+def test_bench_decide_move(benchmark, secure_agent, partner_agent):
+    """Benchmark a full decision, including the reason bookkeeping"""
+    benchmark(secure_agent.decide_move, partner_agent, 1.0)
+
+def test_bench_cooperation_probability(benchmark, secure_agent, partner_agent):
+    """Benchmark the cooperation probability on its own"""
+    benchmark(secure_agent._cooperation_probability, partner_agent, 1.0)
+
+def test_bench_update_after_game(benchmark, secure_agent, partner_agent):
+    """Benchmark the post-game trust, bond, emotion and learning updates"""
+    benchmark(secure_agent.update_after_game, partner_agent, True, False, 1.0, 0.0)
@@ -0,0 +1,245 @@
+"""
+Test suite for the game engine's bookkeeping
+"""
+import asyncio
+import random
+import threading
+import time
+import numpy as np
+import pytest
+import game_engine
+from web3.exceptions import TimeExhausted
+from agent import AttachmentStyle
+from game_engine import GameEngine
+
+class _StuckChain:
+    """Blockchain stand-in whose receipts time out from the given stage on"""
+    contract = True
+    
+    class w3:
+        @staticmethod
+        def to_wei(amount, unit):
+            return int(amount * 10**18)
+    
+    def __init__(self, stuck_stage):
+        self.stages_left = stuck_stage
+    
+    def begin_round(self, addresses):
+        return {}
+    
+    def build_create_game(self, private_key, address, stake_wei, round_ctx):
+        return {}
+    
+    build_join_game = build_reveal_move = build_create_game
+    
+    def build_commit_move(self, game_id, private_key, move, round_ctx):
+        return {}, "salt"
+    
+    def transact_batched(self, transactions):
+        self.stages_left -= 1
+        if self.stages_left < 0:
+            raise TimeExhausted("Transactions not mined after 120 seconds")
+        return [(f"0x{self.stages_left}{i}", "receipt", None) for i in range(len(transactions))]
+    
+    def game_id_from_receipt(self, receipt):
+        return 1
+
+def test_match_history_rows_round_trip(make_agent):
+    """Test that history rows read back as the dicts run_round returned"""
+    agents = [make_agent("A" * 40), make_agent("Partner")]
+    engine = GameEngine(agents)
+    
+    results = [engine.run_round(*agents) for _ in range(3)]
+    
+    assert len(engine.match_history) == 3
+    assert engine.match_history[:] == results
+    # Names longer than any fixed-width string field survive intact
+    assert engine.match_history[-1]['agent1_name'] == "A" * 40
+    assert list(engine.match_history_df['agent1_name']) == ["A" * 40] * 3
+
+def test_match_history_keeps_tx_details_only_for_their_row(make_agent):
+    """Test that on-chain extras are attached to the match they belong to"""
+    engine = GameEngine([make_agent("A"), make_agent("B")])
+    a, b = engine.agents
+    
+    engine._record_match(a, b, True, True, 1.0, 1.0, 1.5, 1.5, {})
+    engine._record_match(a, b, True, False, 1.0, 1.0, 0.0, 2.5, {'game_id': 7})
+    
+    assert 'game_id' not in engine.match_history[0]
+    assert engine.match_history[1]['game_id'] == 7
+    assert engine.match_history[1]['agent2_profit'] == 1.5
+
+def test_statistics_reflect_refreshed_agent_state(make_agent):
+    """Test that balances written straight to an agent show up after a refresh"""
+    engine = GameEngine([make_agent("A"), make_agent("B")])
+    a, _ = engine.agents
+    
+    a.balance = 42.0
+    engine.refresh_agent_state()
+    
+    assert engine.get_statistics()['agent_balances'] == {"A": 42.0, "B": 100.0}
+
+class _SlowChain:
+    """Blockchain stand-in for the per-game API that fails createGame for one account"""
+    contract = True
+    w3 = _StuckChain.w3
+    
+    def __init__(self, failing_key):
+        self.failing_key = failing_key
+        self.in_flight = set()
+        self.overlapped = False
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.game_ids = iter(range(1, 100))
+    
+    def _send(self, private_key):
+        with self.lock:
+            self.overlapped |= private_key in self.in_flight
+            self.in_flight.add(private_key)
+            self.max_in_flight = max(self.max_in_flight, len(self.in_flight))
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight.discard(private_key)
+        return f"0x{private_key}"
+    
+    def create_game(self, private_key, address, stake_wei):
+        tx_hash = self._send(private_key)
+        if private_key == self.failing_key:
+            raise Exception("Broadcasting failed: insufficient funds")
+        with self.lock:
+            return next(self.game_ids), tx_hash
+    
+    def join_game(self, game_id, private_key, stake_wei):
+        return self._send(private_key)
+    
+    def commit_move(self, game_id, private_key, move):
+        return self._send(private_key), "salt"
+    
+    def reveal_move(self, game_id, private_key, move, salt):
+        return self._send(private_key)
+    
+    def get_game(self, game_id):
+        return {}
+
+def test_onchain_round_records_every_game_when_receipts_time_out(make_agent):
+    """Test that a stuck stage fails its games instead of aborting the round"""
+    agents = [make_agent(name) for name in "ABCD"]
+    engine = GameEngine(agents, blockchain=_StuckChain(stuck_stage=2))
+    
+    results = engine.run_rounds_batch([(agents[0], agents[1]), (agents[2], agents[3])])
+    
+    assert len(engine.match_history) == 2
+    for result in results:
+        assert "not mined" in result['error']
+        assert set(result['tx_hashes']) == {'create', 'join'}
+        assert result['agent1_payout'] == result['agent2_payout'] == 0
+
+def test_run_round_mirrors_the_pair_into_the_arrays(make_agent):
+    """Test that a game updates the arrays for just its two agents"""
+    engine = GameEngine([make_agent("A"), make_agent("B"), make_agent("C")])
+    a, b, _ = engine.agents
+    
+    engine.run_round(a, b)
+    
+    assert engine.balances.tolist() == [a.balance, b.balance, 100.0]
+    assert engine.trust_matrix[0, 1] == a.relationships["B"].trust_score
+    assert engine.trust_matrix[1, 0] == b.relationships["A"].trust_score
+    assert np.isnan(engine.trust_matrix[:, 2]).all()
+
+def _play_round(make_agent, play):
+    """Seed, build a fresh six-agent engine and play one round of three pairs with play(engine, pairs)"""
+    random.seed(7)
+    agents = [make_agent(name, style) for name, style in zip("ABCDEF", list(AttachmentStyle) * 2)]
+    engine = GameEngine(agents)
+    results = play(engine, [(agents[0], agents[1]), (agents[2], agents[3]), (agents[4], agents[5])])
+    return engine, results
+
+@pytest.mark.parametrize("min_vectorized", [game_engine._MIN_VECTORIZED_MATCHES, 0])
+def test_run_rounds_batch_matches_run_round(make_agent, monkeypatch, min_vectorized):
+    """Test that a batched round plays out exactly like the same games run one by one"""
+    monkeypatch.setattr(game_engine, "_MIN_VECTORIZED_MATCHES", min_vectorized)
+    
+    serial, serial_results = _play_round(make_agent, lambda e, pairs: [e.run_round(*p) for p in pairs])
+    batch, batch_results = _play_round(make_agent, lambda e, pairs: e.run_rounds_batch(pairs))
+    
+    assert batch_results == serial_results
+    assert batch.match_history[:] == serial.match_history[:]
+    assert batch.get_statistics() == serial.get_statistics()
+
+def test_vectorized_payoffs_follow_the_multiplier_table():
+    """Test every row of the 4x2 payoff table against the scalar calculation"""
+    engine = GameEngine([])
+    moves1 = np.array([False, False, True, True])
+    moves2 = np.array([False, True, False, True])
+    stakes1 = np.array([1.0, 2.0, 3.0, 4.0])
+    stakes2 = np.array([0.5, 1.5, 2.5, 3.5])
+    
+    payouts1, payouts2 = engine._calculate_payoffs_vec(moves1, moves2, stakes1, stakes2)
+    
+    expected = [engine._calculate_payoffs(*args) for args in zip(moves1, moves2, stakes1, stakes2)]
+    assert list(zip(payouts1, payouts2)) == expected
+    assert payouts1.tolist() == [0.5, 5.0, 0.0, 6.0]
+
+def test_run_round_concurrent_matches_run_round_offchain(make_agent):
+    """Test that the concurrent entry point plays off-chain rounds exactly like run_round"""
+    serial, serial_results = _play_round(make_agent, lambda e, pairs: [e.run_round(*p) for p in pairs])
+    concurrent, concurrent_results = _play_round(make_agent, lambda e, pairs: asyncio.run(e.run_round_concurrent(pairs)))
+    
+    assert concurrent_results == serial_results
+    assert concurrent.get_statistics() == serial.get_statistics()
+
+def test_run_round_concurrent_isolates_failures_and_serializes_each_account(make_agent):
+    """Test that one failed game doesn't stop the others and no account sends two transactions at once"""
+    agents = [make_agent(name) for name in "ABCD"]
+    for agent in agents:
+        agent.profile.address = agent.profile.private_key = agent.profile.name
+    chain = _SlowChain(failing_key="C")
+    engine = GameEngine(agents, blockchain=chain)
+    
+    failed_game, played_game = asyncio.run(engine.run_round_concurrent([(agents[2], agents[3]), (agents[0], agents[1])]))
+    
+    assert "insufficient funds" in failed_game['error']
+    assert failed_game['agent1_payout'] == failed_game['agent2_payout'] == 0
+    assert 'error' not in played_game and played_game['on_chain']
+    assert set(played_game['tx_hashes']) == {'create', 'join', 'commit1', 'commit2', 'reveal1', 'reveal2'}
+    assert len(engine.match_history) == 2
+    # Games and paired commits/reveals overlap, but each account sends one at a time
+    assert chain.max_in_flight > 1
+    assert not chain.overlapped
+
+def test_evaluate_bonds_ends_capped_bonds_without_asking_the_agents(make_agent, monkeypatch):
+    """Test that a bond at its round cap breaks before either agent is consulted"""
+    engine = GameEngine([make_agent("A"), make_agent("B")])
+    a, b = engine.agents
+    engine.run_round(a, b)
+    engine._bond_cap[("A", "B")] = 1
+    asked = []
+    for agent in (a, b):
+        monkeypatch.setattr(agent, "wants_rematch", lambda partner: asked.append(partner) or True)
+    
+    assert engine.evaluate_bonds() == [(a, b, False)]
+    assert asked == []
+    assert engine.active_bonds == {} and engine._bond_cap == {}
+
+def test_evaluate_bonds_keeps_pairs_that_never_met_and_breaks_low_trust(make_agent, monkeypatch):
+    """Test the trust check: a never-met pair (NaN trust) continues, distrust ends the bond"""
+    engine = GameEngine([make_agent(name) for name in "ABCD"])
+    a, b, c, d = engine.agents
+    engine.active_bonds[("A", "B")] = 1
+    engine.run_round(c, d)
+    c.relationships["D"].trust_score = 10.0
+    for agent in engine.agents:
+        monkeypatch.setattr(agent, "wants_rematch", lambda partner: True)
+    engine.refresh_agent_state((c,))
+    assert np.isnan(engine.trust_matrix[a._idx, b._idx])
+    
+    assert engine.evaluate_bonds() == [(a, b, True), (c, d, False)]
+    
+    # The surviving bond keeps the lifetime it drew on its first evaluation
+    cap = engine._bond_cap[("A", "B")]
+    assert 5 <= cap <= 10
+    engine.evaluate_bonds()
+    assert engine._bond_cap == {("A", "B"): cap}
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
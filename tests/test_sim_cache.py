@@ -0,0 +1,41 @@
+"""
+Test suite for the simulation run cache
+"""
+import pickle
+import random
+import pytest
+import sim_cache
+from game_engine import GameEngine
+
+def test_cached_runs_hold_no_private_keys(make_agent, tmp_path, monkeypatch):
+    """Test that wallets are kept out of the cache file but handed back on a hit"""
+    monkeypatch.setattr(sim_cache, "CACHE_DIR", str(tmp_path))
+    
+    def make_engine(key):
+        agents = [make_agent("A"), make_agent("B")]
+        for agent in agents:
+            agent.profile.address, agent.profile.private_key = f"0x{agent.profile.name}", key
+        return GameEngine(agents)
+    
+    def simulate(engine, num_rounds):
+        for _ in range(num_rounds):
+            engine.run_round(*engine.agents)
+    
+    rng_state = random.getstate()
+    engine = sim_cache.run_cached(make_engine("0xsecret"), 3, simulate)
+    assert engine.agents[0].profile.private_key == "0xsecret"
+    
+    (cache_file,) = tmp_path.iterdir()
+    assert b"0xsecret" not in cache_file.read_bytes()
+    cached_engine, _, _ = pickle.loads(cache_file.read_bytes())
+    assert cached_engine.agents[0].profile.private_key is None
+    
+    # Same profiles and RNG state: replayed from the cache with this run's wallets
+    random.setstate(rng_state)
+    fresh = make_engine("0xnew")
+    replay = sim_cache.run_cached(fresh, 3, simulate)
+    assert replay is not fresh and len(replay.match_history) == 3
+    assert replay.agents[1].profile.private_key == "0xnew"
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])